@@ -0,0 +1,261 @@
+# api/batch.py
+import contextlib
+import logging
+import threading
+import time
+import urllib.parse
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from api.formats import format_table
+from api.jobs import JobQueueFull
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 3
+DEFAULT_MAX_HEIGHT = 1080
+# 같은 호스트에 메타데이터 요청을 보내는 최소 간격(초)
+DEFAULT_HOST_INTERVAL = 0.5
+# 작업 대기열이 가득 찼을 때 다시 시도하기 전 대기 시간(초)과 최대 시도 횟수
+QUEUE_RETRY_DELAY = 2
+MAX_QUEUE_RETRIES = 30
+READ_SIZE = 1024 * 1024
+
+
+class BatchCancelled(Exception):
+    """클라이언트 연결이 끊겨 배치를 중단함"""
+
+
+class HostRateLimiter:
+    """호스트별로 요청 사이에 최소 간격을 두는 단순한 제한기"""
+
+    def __init__(self, interval=DEFAULT_HOST_INTERVAL):
+        self.interval = interval
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url, cancelled=None):
+        """url의 호스트 차례가 올 때까지 대기. cancelled(Event)가 설정되면 바로 반환"""
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(host, 0))
+            self._next[host] = start + self.interval
+        if start > now:
+            if cancelled is None:
+                time.sleep(start - now)
+            else:
+                cancelled.wait(start - now)
+
+
+# 동시에 진행되는 배치 요청들이 함께 쓰는 제한기 (워커 프로세스 단위)
+host_rate_limiter = HostRateLimiter()
+
+
+def expand_urls(url):
+    """재생목록/채널 URL이면 영상 URL들을 차례로, 아니면 URL 하나를 생성"""
+    from pytubefix import Channel, Playlist
+
+    parsed = urllib.parse.urlsplit(url)
+    if 'list' in urllib.parse.parse_qs(parsed.query):
+        yield from Playlist(url).video_urls
+    elif parsed.path.startswith(('/@', '/channel/', '/c/', '/user/')):
+        yield from Channel(url).video_urls
+    else:
+        yield url
+
+
+def select_streams(yt, max_height=DEFAULT_MAX_HEIGHT):
+    """'max_height 이하 최고 화질 MP4 + 최고 음질 오디오' 정책으로 스트림 선택
+
+    반환값: (비디오 스트림, 오디오 스트림). 합성할 수 없으면 오디오는 None이고
+    비디오는 영상+음성이 함께 있는 progressive 스트림입니다.
+    """
+    items = format_table(yt).best_per_resolution(container='mp4', max_height=max_height)
+    if not items:
+        raise ValueError(f"{max_height}p 이하의 스트림이 없습니다.")
+    return items[0]['stream'], items[0].get('audio_stream')
+
+
+class _ZipOutput:
+    """zipfile이 쓰는 내용을 모아두었다가 응답으로 흘려보내는 비탐색 파일 객체
+
+    seek가 없으므로 zipfile은 CRC/크기를 데이터 뒤(data descriptor)에 기록합니다.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+class _Prefetched:
+    """첫 청크를 미리 받아둔 청크 이터레이터 (close()하면 남은 다운로드도 멈춤)"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._first = next(self._chunks, None)
+
+    def __iter__(self):
+        if self._first is not None:
+            first, self._first = self._first, None
+            yield first
+        yield from self._chunks
+
+    def close(self):
+        close = getattr(self._chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+class BatchDownloader:
+    """여러 영상을 제한된 병렬도로 준비하면서 무압축 ZIP으로 바로 스트리밍
+
+    메타데이터 추출과 병합은 앞쪽 몇 개 항목에 대해서만 미리 진행하므로
+    메모리 사용량은 배치 크기와 관계없이 일정합니다. 병합은 JobManager를
+    거치므로 이미 병합된 영상은 디스크에서 바로 읽습니다.
+    """
+
+    def __init__(self, resolve, job_manager, filename_for, workers=DEFAULT_WORKERS,
+                 rate_limiter=None, max_height=DEFAULT_MAX_HEIGHT):
+        self.resolve = resolve
+        self.job_manager = job_manager
+        self.filename_for = filename_for
+        self.workers = workers
+        self.rate_limiter = rate_limiter or host_rate_limiter
+        self.max_height = max_height
+
+    def _prepare(self, url, cancelled, progressive_chunks):
+        """영상 하나를 준비하고 (파일 이름, 열린 결과 파일, progressive 청크)를 반환
+
+        합성이 필요 없는 영상은 결과 파일 대신 첫 청크를 미리 받아둔 청크
+        이터레이터를 돌려주므로, 만료된 URL(403) 같은 실패는 ZIP 항목을 쓰기
+        전에 드러납니다. cancelled(Event)가 설정되면 단계 사이에서
+        BatchCancelled로 중단합니다.
+        """
+        self.rate_limiter.wait(url, cancelled)
+        if cancelled.is_set():
+            raise BatchCancelled()
+        yt = self.resolve(url)
+        video_stream, audio_stream = select_streams(yt, self.max_height)
+        filename = self.filename_for(yt, video_stream)
+        if audio_stream is None:
+            return filename, None, _Prefetched(progressive_chunks(video_stream.url))
+
+        for _ in range(MAX_QUEUE_RETRIES):
+            if cancelled.is_set():
+                raise BatchCancelled()
+            try:
+                job = self.job_manager.submit(yt, video_stream, audio_stream, filename)
+                break
+            except JobQueueFull:
+                cancelled.wait(QUEUE_RETRY_DELAY)
+        else:
+            raise JobQueueFull("병합 작업 대기열이 계속 가득 차 있습니다.")
+        # 제출한 작업은 다른 요청과 공유될 수 있으므로 취소하지 않고 기다리기만 멈춤
+        while not job.done.wait(QUEUE_RETRY_DELAY):
+            if cancelled.is_set():
+                raise BatchCancelled()
+        if job.status != 'finished':
+            raise RuntimeError(job.error)
+        if cancelled.is_set():
+            raise BatchCancelled()
+        # 파일을 먼저 열어두면 LRU 정리로 삭제되어도 끝까지 읽을 수 있음
+        return filename, open(job.path, 'rb'), None
+
+    def generate(self, urls, progressive_chunks):
+        """ZIP 바이트 청크를 생성. progressive_chunks(url)는 합성 없는 스트림을 읽는 함수
+
+        준비나 전송에 실패한 항목은 NNN.error.txt 항목으로 남기고 다음 항목을 이어갑니다.
+        """
+        output = _ZipOutput()
+        archive = zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED, allowZip64=True)
+        used_names = set()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='batch')
+        cancelled = threading.Event()
+        pending = deque()
+        urls = iter(urls)
+
+        def fill():
+            while len(pending) < self.workers + 1:
+                url = next(urls, None)
+                if url is None:
+                    return
+                pending.append((url, executor.submit(self._prepare, url, cancelled, progressive_chunks)))
+
+        def unique(name):
+            base, dot, ext = name.rpartition('.')
+            candidate, n = name, 1
+            while candidate in used_names:
+                n += 1
+                candidate = f'{base} ({n}){dot}{ext}'
+            used_names.add(candidate)
+            return candidate
+
+        def write_error(number, url, error):
+            logger.error("배치 항목 실패 (%s): %s", url, error)
+            archive.writestr(unique(f'{number:03d}.error.txt'), f'{url}\n{error}\n')
+
+        try:
+            fill()
+            number = 0
+            while pending:
+                url, future = pending.popleft()
+                number += 1
+                fill()
+                try:
+                    filename, source, chunks = future.result()
+                except Exception as e:
+                    write_error(number, url, e)
+                    yield from output.drain()
+                    continue
+
+                info = zipfile.ZipInfo(unique(filename), date_time=time.localtime()[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                try:
+                    # 도중에 실패해도 항목은 받은 데까지 닫고 오류 항목을 덧붙여 ZIP을 유지
+                    with archive.open(info, 'w', force_zip64=True) as entry:
+                        if source is not None:
+                            with source:
+                                while True:
+                                    data = source.read(READ_SIZE)
+                                    if not data:
+                                        break
+                                    entry.write(data)
+                                    yield from output.drain()
+                        else:
+                            with contextlib.closing(chunks):
+                                for data in chunks:
+                                    entry.write(data)
+                                    yield from output.drain()
+                except Exception as e:
+                    write_error(number, url, e)
+                yield from output.drain()
+
+            archive.close()
+            yield from output.drain()
+        finally:
+            # 이미 실행 중인 _prepare는 cancelled를 보고 멈춤
+            cancelled.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            # 중간에 끊긴 경우 미리 열어둔 결과 파일 정리
+            for _, future in pending:
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    _, source, chunks = future.result()
+                    (source or chunks).close()
@@ -0,0 +1,263 @@
+# api/cache.py
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+
+from api import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# 서명된 googlevideo URL이 만료되기 이 시간(초) 전에 캐시 항목을 버림
+EXPIRE_MARGIN = 600
+DEFAULT_TTL = 4 * 60 * 60
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class MemoryBackend:
+    """프로세스 내부 LRU 저장소 (워커 간 공유되지 않음)"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._counters = {'hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries), bytes=self._size)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires)
+            self._size += len(value)
+            while self._size > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        value, _ = self._entries.pop(key)
+        self._size -= len(value)
+
+
+class SQLiteBackend:
+    """SQLite 파일 기반 LRU 저장소 (같은 호스트의 gunicorn 워커끼리 공유)
+
+    적중/실패 횟수도 같은 파일에 기록하므로 stats()는 모든 워커의 합계입니다.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, value TEXT, size INTEGER, expires REAL, accessed REAL)'
+            )
+            db.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+            db.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)')
+
+    def _connect(self):
+        # fork 이후에는 부모 프로세스의 연결을 쓰지 않도록 PID도 확인
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=10)
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def count(self, name):
+        with self._connect() as db:
+            db.execute('INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)', (name,))
+            db.execute('UPDATE counters SET value = value + 1 WHERE name = ?', (name,))
+
+    def stats(self):
+        with self._connect() as db:
+            counters = dict(db.execute('SELECT name, value FROM counters').fetchall())
+            entries, size = db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE expires > ?', (time.time(),)
+            ).fetchone()
+        return {'hits': counters.get('hits', 0), 'misses': counters.get('misses', 0),
+                'entries': entries, 'bytes': size}
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute('SELECT value FROM entries WHERE key = ? AND expires > ?', (key, now)).fetchone()
+            if row is None:
+                return None
+            db.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+            return row[0]
+
+    def set(self, key, value, expires):
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                'INSERT OR REPLACE INTO entries (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)',
+                (key, value, len(value), expires, now)
+            )
+            db.execute('DELETE FROM entries WHERE expires <= ?', (now,))
+            # 전체 크기가 한도를 넘으면 가장 오래 사용되지 않은 항목부터 삭제
+            total = db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total > self.max_bytes:
+                rows = db.execute('SELECT key, size FROM entries ORDER BY accessed').fetchall()
+                for old_key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    db.execute('DELETE FROM entries WHERE key = ?', (old_key,))
+                    total -= size
+
+
+def _url_expiry(vid_info):
+    """스트림 URL의 expire 파라미터 중 가장 이른 시각을 반환"""
+    streaming_data = vid_info.get('streamingData', {})
+    expiries = []
+    for fmt in streaming_data.get('formats', []) + streaming_data.get('adaptiveFormats', []):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(fmt.get('url', '')).query)
+        if 'expire' in query:
+            expiries.append(int(query['expire'][0]))
+    if not expiries and 'expiresInSeconds' in streaming_data:
+        expiries.append(time.time() + int(streaming_data['expiresInSeconds']))
+    return min(expiries) if expiries else None
+
+
+class MetadataCache:
+    """영상 ID별로 vid_info와 복호화된 스트림 목록을 보관하는 TTL 캐시
+
+    /get_streams에서 만든 결과를 /download에서 그대로 재사용하여
+    watch 페이지, innertube 호출, 서명 복호화를 반복하지 않습니다.
+    """
+
+    def __init__(self, backend, ttl=DEFAULT_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.player_cache = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """pytubefix를 불러오고 플레이어 캐시를 연결 (처음 한 번만)
+
+        pytubefix는 불러올 때 innertube, jsinterp, sabr 등을 모두 함께 읽으므로
+        영상 정보가 필요한 첫 요청(또는 create_app의 준비 단계)까지 미룹니다.
+        """
+        if self.player_cache is None:
+            with self._lock:
+                if self.player_cache is None:
+                    from api.player_cache import create_player_cache
+                    self.player_cache = create_player_cache()
+        return self.player_cache
+
+    def stats(self):
+        """저장소 기준 적중/실패 횟수와 항목 수 (SQLite면 워커 전체, memory면 이 워커)"""
+        return self.backend.stats()
+
+    def _count(self, hit):
+        self.backend.count('hits' if hit else 'misses')
+        metrics.inc('ytdl_metadata_cache_requests_total', result='hit' if hit else 'miss')
+
+    def get_youtube(self, url, client='WEB'):
+        """캐시된 정보가 있으면 네트워크 없이 YouTube 객체를 복원하고, 없으면 새로 추출"""
+        self.load()
+        from pytubefix import YouTube, extract
+
+        key = f'{client}:{extract.video_id(url)}'
+        value = self.backend.get(key)
+        if value is not None:
+            try:
+                with metrics.span('cache_restore'):
+                    yt = self._restore(url, client, json.loads(value))
+                self._count(True)
+                return yt
+            except (KeyError, ValueError) as e:
+                logger.warning("캐시 항목 복원 실패 (%s): %s", key, e)
+
+        self._count(False)
+        with metrics.span('extract'):
+            with metrics.span('youtube_init'):
+                yt = YouTube(url, client=client)
+            # 스트림 목록을 만들면서 vid_info 안의 URL이 복호화된 상태로 바뀜
+            with metrics.span('streams'):
+                yt.streams
+        self._store(key, yt)
+        return yt
+
+    def _store(self, key, yt):
+        expires = time.time() + self.ttl
+        url_expiry = _url_expiry(yt.vid_info)
+        if url_expiry is not None:
+            expires = min(expires, url_expiry - EXPIRE_MARGIN)
+        if expires <= time.time():
+            return
+        value = json.dumps({'client': yt.client, 'po_token': yt.po_token, 'vid_info': yt.vid_info})
+        self.backend.set(key, value, expires)
+
+    @staticmethod
+    def _restore(url, client, entry):
+        from pytubefix import YouTube, Stream
+
+        yt = YouTube(url, client=client)
+        yt.client = entry['client']
+        yt.po_token = entry['po_token']
+        yt.vid_info = entry['vid_info']
+
+        streaming_data = yt.vid_info['streamingData']
+        manifest = streaming_data.get('formats', []) + streaming_data.get('adaptiveFormats', [])
+        yt._fmt_streams = [
+            Stream(
+                stream=stream,
+                monostate=yt.stream_monostate,
+                po_token=yt.po_token,
+                video_playback_ustreamer_config=yt.video_playback_ustreamer_config
+            )
+            for stream in manifest
+        ]
+        yt.stream_monostate.title = yt.title
+        yt.stream_monostate.duration = yt.length
+        return yt
+
+
+def create_cache():
+    """환경 변수 설정에 따라 캐시 생성
+
+    METADATA_CACHE_BACKEND: sqlite(기본값, 워커 간 공유) 또는 memory
+    METADATA_CACHE_PATH: SQLite 파일 경로
+    METADATA_CACHE_TTL: 최대 보관 시간(초)
+    METADATA_CACHE_MAX_BYTES: 저장소 최대 크기(바이트)
+    """
+    max_bytes = int(os.environ.get('METADATA_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+    ttl = int(os.environ.get('METADATA_CACHE_TTL', DEFAULT_TTL))
+    if os.environ.get('METADATA_CACHE_BACKEND', 'sqlite') == 'memory':
+        backend = MemoryBackend(max_bytes)
+    else:
+        path = os.environ.get(
+            'METADATA_CACHE_PATH',
+            os.path.join(tempfile.gettempdir(), 'youtube-downloader-metadata.sqlite3')
+        )
+        backend = SQLiteBackend(path, max_bytes)
+    return MetadataCache(backend, ttl)
@@ -0,0 +1,237 @@
+# api/downloader.py
+import http.client
+import re
+import threading
+import time
+import urllib.parse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from api import metrics
+
+
+# 구간(세그먼트) 하나의 크기와 소켓에서 한 번에 읽는 크기
+SEGMENT_SIZE = 2 * 1024 * 1024
+READ_SIZE = 64 * 1024
+# 동시에 받는 구간 수 (스트림 하나당)
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 3
+DEFAULT_TIMEOUT = 30
+# 5xx/429 응답 뒤 다시 요청하기 전 대기 시간(초, 시도할 때마다 두 배)과 Retry-After 상한
+RETRY_BACKOFF = 0.5
+MAX_RETRY_AFTER = 10
+
+HEADERS = {"User-Agent": "Mozilla/5.0", "Accept-Language": "en-US,en"}
+
+_CONTENT_RANGE_RE = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+
+
+class DownloadError(Exception):
+    """구간 다운로드 실패"""
+
+
+class TransientHTTPError(DownloadError):
+    """잠시 후 다시 시도할 수 있는 응답 (5xx, 429)"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ConnectionPool:
+    """호스트별 keep-alive HTTP 연결을 재사용하는 간단한 풀"""
+
+    def __init__(self, max_idle_per_host=8, timeout=DEFAULT_TIMEOUT):
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scheme, netloc):
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            if idle:
+                return idle.pop()
+        return self.connect(scheme, netloc)
+
+    def connect(self, scheme, netloc):
+        if scheme == 'https':
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def release(self, scheme, netloc, conn):
+        with self._lock:
+            idle = self._idle.setdefault((scheme, netloc), [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+
+# 워커 프로세스 전체에서 공유하는 연결 풀
+pool = ConnectionPool()
+
+
+def _request_range(url, start, end, redirects=5):
+    """Range 요청을 보내고 (응답, 연결, 연결 키)를 반환. 리다이렉트는 따라감"""
+    for _ in range(redirects + 1):
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path + (f'?{parts.query}' if parts.query else '')
+        conn = pool.acquire(parts.scheme, parts.netloc)
+        headers = dict(HEADERS, Range=f'bytes={start}-{end}')
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            # 서버가 끊어버린 keep-alive 연결일 수 있으므로 새 연결로 한 번 더 시도
+            conn.close()
+            conn = pool.connect(parts.scheme, parts.netloc)
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+
+        if response.status in (301, 302, 303, 307, 308):
+            url = urllib.parse.urljoin(url, response.getheader('Location'))
+            response.read()
+            pool.release(parts.scheme, parts.netloc, conn)
+            continue
+        if response.status not in (200, 206):
+            response.read()
+            conn.close()
+            message = f"HTTP {response.status} ({start}-{end})"
+            if response.status == 429 or response.status >= 500:
+                retry_after = response.getheader('Retry-After', '')
+                raise TransientHTTPError(message, int(retry_after) if retry_after.isdigit() else None)
+            raise DownloadError(message)
+        return response, conn, (parts.scheme, parts.netloc)
+    raise DownloadError("리다이렉트가 너무 많습니다.")
+
+
+def _retry_delay(tries, error):
+    """다시 시도하기 전 대기 시간. 연결 오류는 바로, 상태 코드 오류는 Retry-After나 백오프만큼"""
+    if not isinstance(error, TransientHTTPError):
+        return 0
+    if error.retry_after is not None:
+        return min(error.retry_after, MAX_RETRY_AFTER)
+    return RETRY_BACKOFF * 2 ** (tries - 1)
+
+
+def _total_size(response):
+    """첫 응답의 Content-Range(없으면 Content-Length)에서 전체 크기를 얻음"""
+    match = _CONTENT_RANGE_RE.match(response.getheader('Content-Range') or '')
+    if match and match.group(3) != '*':
+        return int(match.group(3))
+    if response.status == 200 and response.getheader('Content-Length'):
+        return int(response.getheader('Content-Length'))
+    return None
+
+
+def _read_range(url, start, end, sink, retries=DEFAULT_RETRIES, first_response=None, parent=None):
+    """start~end 구간을 READ_SIZE 단위로 읽어 sink(offset, data)에 전달
+
+    중간에 끊기면 이미 받은 위치부터 다시 요청합니다.
+    """
+    with metrics.span('segment', parent=parent):
+        _read_range_with_retry(url, start, end, sink, retries, first_response)
+
+
+def _read_range_with_retry(url, start, end, sink, retries, first_response):
+    offset = start
+    tries = 0
+    pending = first_response
+    while offset <= end:
+        conn = None
+        try:
+            if pending:
+                response, conn, key = pending
+                pending = None
+            else:
+                response, conn, key = _request_range(url, offset, end)
+                if response.status == 200 and offset != 0:
+                    conn.close()
+                    raise DownloadError("서버가 Range 요청을 지원하지 않습니다.")
+            remaining = end - offset + 1
+            while remaining > 0:
+                data = response.read(min(READ_SIZE, remaining))
+                if not data:
+                    break
+                sink(offset, data)
+                metrics.inc('ytdl_download_bytes_total', len(data))
+                offset += len(data)
+                remaining -= len(data)
+            if remaining == 0 and response.isclosed():
+                pool.release(*key, conn)
+            else:
+                conn.close()
+            if remaining > 0:
+                raise http.client.IncompleteRead(b'', remaining)
+        except (http.client.HTTPException, OSError, TransientHTTPError) as e:
+            # 읽는 도중 실패한 연결은 풀에 돌려놓지 않고 바로 닫음
+            if conn is not None:
+                conn.close()
+            tries += 1
+            metrics.inc('ytdl_segment_retries_total')
+            if tries > retries:
+                raise DownloadError(f"구간 다운로드 실패 ({offset}-{end}): {e}") from e
+            time.sleep(_retry_delay(tries, e))
+
+
+def _segments(first_end, size, segment_size):
+    return [(pos, min(pos + segment_size, size) - 1)
+            for pos in range(first_end + 1, size, segment_size)]
+
+
+def _probe(url, segment_size, start=0, retries=DEFAULT_RETRIES):
+    """첫 구간을 요청하면서 전체 크기를 알아냄 (크기만을 위한 별도 요청 없음)"""
+    tries = 0
+    while True:
+        try:
+            first = _request_range(url, start, start + segment_size - 1)
+            break
+        except TransientHTTPError as e:
+            tries += 1
+            metrics.inc('ytdl_segment_retries_total')
+            if tries > retries:
+                raise
+            time.sleep(_retry_delay(tries, e))
+    size = _total_size(first[0])
+    if size is None:
+        first[1].close()
+        raise DownloadError("파일 크기를 알 수 없습니다.")
+    if start and first[0].status == 200:
+        first[1].close()
+        raise DownloadError("서버가 Range 요청을 지원하지 않습니다.")
+    return first, size
+
+
+def iter_ranges(url, workers=DEFAULT_WORKERS, segment_size=SEGMENT_SIZE, retries=DEFAULT_RETRIES, start=0):
+    """여러 구간을 동시에 받으면서 순서대로 바이트 청크를 생성
+
+    메모리에는 최대 workers * 2개의 구간만 보관합니다. start를 지정하면
+    그 위치부터 이어서 받습니다.
+    """
+    first, size = _probe(url, segment_size, start, retries)
+    first_end = min(start + segment_size, size) - 1
+    # 구간은 다른 스레드에서 받으므로 현재 구간을 부모로 명시
+    parent = metrics.current_span()
+
+    def fetch(start, end, first_response=None):
+        buffer = bytearray(end - start + 1)
+
+        def sink(offset, data):
+            buffer[offset - start:offset - start + len(data)] = data
+
+        _read_range(url, start, end, sink, retries, first_response, parent)
+        return bytes(buffer)
+
+    segments = deque(_segments(first_end, size, segment_size))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = deque([executor.submit(fetch, start, first_end, first)])
+    try:
+        while futures:
+            while segments and len(futures) < workers * 2:
+                futures.append(executor.submit(fetch, *segments.popleft()))
+            yield futures.popleft().result()
+    finally:
+        # 소비자가 중간에 멈춘 경우 대기 중인 구간은 취소
+        executor.shutdown(wait=False, cancel_futures=True)
+
@@ -0,0 +1,152 @@
+# api/formats.py
+import os
+
+
+# 코덱 문자열 앞부분 → 코덱 계열
+VIDEO_CODECS = {'avc1': 'h264', 'av01': 'av1', 'vp09': 'vp9', 'vp9': 'vp9', 'vp8': 'vp8'}
+AUDIO_CODECS = {'mp4a': 'aac', 'opus': 'opus', 'vorbis': 'vorbis'}
+
+# 컨테이너별로 트랜스코딩 없이(-c copy) 넣을 수 있는 코덱
+MUXABLE = {
+    'mp4': ({'h264', 'av1', 'vp9'}, {'aac', 'opus'}),
+    'webm': ({'vp9', 'av1', 'vp8'}, {'opus', 'vorbis'}),
+}
+
+# 같은 해상도/음질 안에서의 선호 순서 (환경 변수로 변경 가능)
+VIDEO_CODEC_PREFERENCE = os.environ.get('VIDEO_CODEC_PREFERENCE', 'h264,av1,vp9').split(',')
+AUDIO_CODEC_PREFERENCE = os.environ.get('AUDIO_CODEC_PREFERENCE', 'aac,opus').split(',')
+
+
+def _number(value, suffix):
+    """'1080p' → 1080, '128kbps' → 128, 없으면 0"""
+    if not value:
+        return 0
+    try:
+        return int(value.replace(suffix, ''))
+    except ValueError:
+        return 0
+
+
+def _family(codec, families):
+    if not codec:
+        return None
+    prefix = codec.split('.')[0].lower()
+    return families.get(prefix, prefix)
+
+
+def _preference(family, order):
+    # 목록 앞쪽일수록 높은 값, 목록에 없으면 가장 낮음
+    return len(order) - order.index(family) if family in order else 0
+
+
+class Format:
+    """스트림 하나와 미리 계산해둔 정렬/필터용 값"""
+
+    __slots__ = ('stream', 'itag', 'height', 'abr', 'fps', 'bitrate', 'container',
+                 'video_codec', 'audio_codec', 'progressive')
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.itag = stream.itag
+        self.height = _number(stream.resolution, 'p')
+        self.abr = _number(stream.abr, 'kbps')
+        self.fps = getattr(stream, 'fps', 0) or 0
+        self.bitrate = stream.bitrate or 0
+        self.container = stream.subtype
+        self.video_codec = _family(stream.video_codec, VIDEO_CODECS)
+        self.audio_codec = _family(stream.audio_codec, AUDIO_CODECS)
+        self.progressive = stream.is_progressive
+
+
+class FormatTable:
+    """스트림 목록을 한 번만 훑어 유형/컨테이너별로 나눠둔 표
+
+    StreamQuery.filter().order_by() 체인을 여러 번 만드는 대신
+    이 표에서 결과 페이지에 필요한 값을 한 번에 고릅니다.
+    """
+
+    def __init__(self, streams, video_preference=None, audio_preference=None):
+        self.video_preference = video_preference or VIDEO_CODEC_PREFERENCE
+        self.audio_preference = audio_preference or AUDIO_CODEC_PREFERENCE
+        self.progressive = []
+        self.video = []
+        self.audio = []
+        self.by_itag = {}
+        for stream in streams:
+            fmt = Format(stream)
+            self.by_itag[fmt.itag] = fmt
+            if fmt.progressive:
+                self.progressive.append(fmt)
+            elif stream.type == 'video':
+                self.video.append(fmt)
+            elif stream.type == 'audio':
+                self.audio.append(fmt)
+
+    def _video_key(self, fmt):
+        return (fmt.height, fmt.fps, _preference(fmt.video_codec, self.video_preference), fmt.bitrate)
+
+    def _audio_key(self, fmt):
+        return (_preference(fmt.audio_codec, self.audio_preference), fmt.abr, fmt.bitrate)
+
+    def best_audio(self, container='mp4'):
+        """container에 그대로 넣을 수 있는 오디오 중 선호 코덱, 높은 음질 순으로 최고"""
+        allowed = MUXABLE.get(container, (None, None))[1]
+        candidates = [f for f in self.audio if allowed is None or f.audio_codec in allowed]
+        return max(candidates, key=self._audio_key).stream if candidates else None
+
+    def audio_by_abr(self):
+        """오디오 스트림을 음질 높은 순으로 정렬"""
+        return [f.stream for f in sorted(self.audio, key=lambda f: f.abr, reverse=True)]
+
+    def best_per_resolution(self, container='mp4', max_height=None):
+        """해상도마다 하나씩, 높은 해상도부터 결과 페이지용 항목을 반환
+
+        같은 해상도에서는 바로 받을 수 있는 progressive 스트림을 우선하고,
+        없으면 선호 코덱의 adaptive 스트림에 합성할 오디오를 짝지어 줍니다.
+        """
+        video_codecs = MUXABLE.get(container, (None, None))[0]
+        audio = self.best_audio(container)
+        best = {}
+        for fmt in self.progressive:
+            if fmt.container != container or not fmt.height:
+                continue
+            if max_height and fmt.height > max_height:
+                continue
+            current = best.get(fmt.height)
+            if current is None or self._video_key(fmt) > self._video_key(current):
+                best[fmt.height] = fmt
+        if audio is not None:
+            progressive_heights = set(best)
+            for fmt in self.video:
+                if fmt.height in progressive_heights or not fmt.height:
+                    continue
+                if max_height and fmt.height > max_height:
+                    continue
+                if fmt.container != container or (video_codecs and fmt.video_codec not in video_codecs):
+                    continue
+                current = best.get(fmt.height)
+                if current is None or self._video_key(fmt) > self._video_key(current):
+                    best[fmt.height] = fmt
+
+        items = []
+        for height in sorted(best, reverse=True):
+            fmt = best[height]
+            item = {
+                'stream': fmt.stream,
+                'type': 'progressive' if fmt.progressive else 'adaptive',
+                'has_audio': fmt.progressive,
+                'resolution': fmt.stream.resolution,
+            }
+            if not fmt.progressive:
+                item['audio_stream'] = audio
+            items.append(item)
+        return items
+
+
+def format_table(yt):
+    """YouTube 객체마다 한 번만 표를 만들어 재사용"""
+    table = getattr(yt, '_format_table', None)
+    if table is None:
+        table = FormatTable(yt.fmt_streams)
+        yt._format_table = table
+    return table
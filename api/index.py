@@ -1,18 +1,62 @@
 # api/index.py
-from flask import Flask, render_template, request, redirect, Response, stream_with_context
-from pytubefix import YouTube
+from flask import Flask, render_template, request, redirect, Response, stream_with_context, jsonify
 import urllib.parse
-import subprocess
-import tempfile
+import logging
 import os
-import threading
-import time
 import re
+import time
+
+from api import metrics
+from api.batch import BatchDownloader, expand_urls
+from api.cache import create_cache
+from api.downloader import iter_ranges
+from api.formats import format_table
+from api.jobs import JobQueueFull, create_job_manager, output_key
+from api.merge import merge_streams
+from api.sabr import open_streams
+from api.serving import send_media_file
 
 
+# 로그 레벨은 LOG_LEVEL 환경 변수로 지정 (DEBUG, INFO, WARNING, ...)
+logging.basicConfig(
+    level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+    format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+)
+logger = logging.getLogger(__name__)
+
 # Flask 앱 생성. 템플릿 폴더 경로를 상대 경로로 정확히 지정합니다.
 app = Flask(__name__, template_folder='../templates')
 
+# /get_streams와 /download가 공유하는 영상 정보 캐시
+# (pytubefix와 플레이어 JS 캐시는 처음 필요할 때 metadata_cache.load()로 불러옴)
+metadata_cache = create_cache()
+# 고화질 병합 작업을 요청 스레드 밖에서 실행하는 작업 관리자
+job_manager = create_job_manager()
+
+
+def create_app():
+    """gunicorn용 앱 팩토리 (`api.index:create_app()`)
+
+    첫 요청이 치르던 준비 작업을 미리 실행합니다. gunicorn --preload와 함께
+    쓰면 마스터에서 한 번만 실행되고, 워커들은 포크로 결과를 공유합니다.
+    - pytubefix(innertube, jsinterp, sabr 등)를 불러오고 플레이어 캐시 연결
+    - 디스크에 남은 최근 플레이어의 JS를 읽고 서명/n 함수를 미리 해석
+    - URL 파싱 정규식과 템플릿 컴파일
+    WARM_UP=0 이면 건너뛰고 모두 첫 사용 시점에 불러옵니다.
+    """
+    if os.environ.get('WARM_UP', '1') == '0':
+        return app
+
+    started = time.perf_counter()
+    player_cache = metadata_cache.load()
+    players = player_cache.preload()
+    from pytubefix import extract
+    extract.video_id('https://www.youtube.com/watch?v=aqz-KE-bpKQ')
+    for template in ('index.html', 'result.html'):
+        app.jinja_env.get_template(template)
+    logger.info("준비 완료: %.3fs (pid %d, 플레이어 %d개)", time.perf_counter() - started, os.getpid(), players)
+    return app
+
 
 def safe_filename(filename):
     """안전한 파일명 생성 함수"""
@@ -43,60 +87,27 @@ def home():
     return render_template('index.html')
 
 
+@app.route('/cache_stats')
+def cache_stats():
+    return jsonify(metadata_cache.stats())
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/get_streams', methods=['POST'])
 def get_streams():
     url = request.form['url']
     try:
-        yt = YouTube(url, client='WEB')
-        
-        # 모든 비디오 스트림 가져오기
-        all_video_streams = []
-        
-        # 1. Progressive 스트림 (영상+음성이 함께 있는 저화질)
-        progressive_streams = yt.streams.filter(progressive=True, file_extension='mp4').order_by('resolution').desc()
-        for stream in progressive_streams:
-            all_video_streams.append({
-                'stream': stream,
-                'type': 'progressive',
-                'has_audio': True,
-                'resolution': stream.resolution
-            })
-        
-        # 2. Adaptive 스트림 (고화질 영상만, 음성 별도)
-        adaptive_video_streams = yt.streams.filter(adaptive=True, type='video', file_extension='mp4').order_by('resolution').desc()
-        
-        # 최고 품질 오디오 스트림 찾기
-        best_audio = yt.streams.filter(only_audio=True).order_by('abr').desc().first()
-        
-        for stream in adaptive_video_streams:
-            all_video_streams.append({
-                'stream': stream,
-                'type': 'adaptive',
-                'has_audio': False,
-                'resolution': stream.resolution,
-                'audio_stream': best_audio
-            })
-        
-        # 중복 해상도 제거 (높은 품질 우선)
-        seen_resolutions = set()
-        unique_video_streams = []
-        for item in all_video_streams:
-            resolution = item['resolution']
-            if resolution and resolution not in seen_resolutions:
-                seen_resolutions.add(resolution)
-                unique_video_streams.append(item)
-        
-        # 해상도 순으로 정렬 (높은 해상도부터)
-        def resolution_sort_key(item):
-            res = item['resolution']
-            if res:
-                return int(res.replace('p', ''))
-            return 0
-        
-        unique_video_streams.sort(key=resolution_sort_key, reverse=True)
+        yt = metadata_cache.get_youtube(url)
         
-        # 오디오 스트림
-        audio_streams = yt.streams.filter(only_audio=True).order_by('abr').desc()
+        # 스트림 목록을 한 번만 훑어 만든 표에서 해상도별 최고 품질과 오디오를 선택
+        # (같은 해상도면 영상+음성이 함께 있는 progressive 우선, 없으면 adaptive + 오디오 합성)
+        table = format_table(yt)
+        unique_video_streams = table.best_per_resolution(container='mp4')
+        audio_streams = table.audio_by_abr()
         
         return render_template('result.html', 
                             video=yt, 
@@ -119,7 +130,7 @@ def download():
     audio_itag = request.args.get('audio_itag')
     
     try:
-        yt = YouTube(url, client='WEB')
+        yt = metadata_cache.get_youtube(url)
         
         if download_type == 'progressive':
             # Progressive 스트림 (영상+음성 함께)
@@ -138,117 +149,38 @@ def download():
             safe_title = safe_filename(yt.title)
             filename = f"{safe_title}_{video_stream.resolution}.mp4"
             
+            # 이미 병합된 파일이 있으면 Range/이어받기가 가능한 파일 전송으로 처리
+            cached_path = job_manager.store.lookup(
+                output_key(yt.video_id, video_stream.itag, audio_stream.itag) + '.mp4'
+            )
+            if cached_path:
+                return send_media_file(cached_path, headers={
+                    'Content-Disposition': encode_filename_for_header(filename)
+                })
+            
             # 디버깅 정보 출력
-            print(f"=== 스트림 정보 ===")
-            print(f"Video URL: {video_stream.url}")
-            print(f"Audio URL: {audio_stream.url}")
-            print(f"Video itag: {video_stream.itag}")
-            print(f"Audio itag: {audio_stream.itag}")
-            print(f"Video resolution: {video_stream.resolution}")
-            print(f"Audio bitrate: {audio_stream.abr}")
+            logger.debug("Video URL: %s", video_stream.url)
+            logger.debug("Audio URL: %s", audio_stream.url)
+            logger.info("스트리밍 병합: %s video itag=%s (%s) audio itag=%s (%s)",
+                        yt.video_id, video_stream.itag, video_stream.resolution,
+                        audio_stream.itag, audio_stream.abr)
             
             def generate():
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    temp_video = os.path.join(temp_dir, "video.mp4")
-                    temp_audio = os.path.join(temp_dir, "audio.mp4")
-                    temp_output = os.path.join(temp_dir, "output.mp4")
-                    
-                    try:
-                        print("=== 비디오 다운로드 시작 ===")
-                        # 1단계: 비디오 파일 다운로드
-                        video_stream.download(output_path=temp_dir, filename="video.mp4")
-                        
-                        print("=== 오디오 다운로드 시작 ===")
-                        # 2단계: 오디오 파일 다운로드
-                        audio_stream.download(output_path=temp_dir, filename="audio.mp4")
-                        
-                        # 파일 존재 및 크기 확인
-                        if not os.path.exists(temp_video):
-                            yield "비디오 파일 다운로드 실패".encode('utf-8')
-                            return
-                        if not os.path.exists(temp_audio):
-                            yield "오디오 파일 다운로드 실패".encode('utf-8')
-                            return
-                            
-                        video_size = os.path.getsize(temp_video)
-                        audio_size = os.path.getsize(temp_audio)
-                        print(f"Video size: {video_size} bytes")
-                        print(f"Audio size: {audio_size} bytes")
-                        
-                        if video_size == 0 or audio_size == 0:
-                            yield "다운로드된 파일이 비어있습니다.".encode('utf-8')
-                            return
-                        
-                        print("=== FFmpeg 합성 시작 ===")
-                        # 3단계: FFmpeg로 합성
-                        cmd = [
-                            'ffmpeg',
-                            '-i', temp_video,
-                            '-i', temp_audio,
-                            '-c:v', 'copy',
-                            '-c:a', 'copy',
-                            '-f', 'mp4',
-                            '-movflags', 'faststart',
-                            '-y',
-                            temp_output
-                        ]
-                        
-                        print(f"FFmpeg 명령어: {' '.join(cmd)}")
-                        
-                        # FFmpeg 실행
-                        process = subprocess.run(
-                            cmd,
-                            capture_output=True,
-                            timeout=300,
-                            text=True
-                        )
-                        
-                        print(f"FFmpeg return code: {process.returncode}")
-                        if process.stderr:
-                            print(f"FFmpeg stderr: {process.stderr}")
-                        if process.stdout:
-                            print(f"FFmpeg stdout: {process.stdout}")
-                        
-                        if process.returncode != 0:
-                            error_msg = f"FFmpeg 오류 (코드: {process.returncode}): {process.stderr}"
-                            yield error_msg.encode('utf-8')
-                            return
-                        
-                        # 생성된 파일 확인
-                        if not os.path.exists(temp_output):
-                            yield "출력 파일이 생성되지 않았습니다.".encode('utf-8')
-                            return
-                            
-                        output_size = os.path.getsize(temp_output)
-                        print(f"Output size: {output_size} bytes")
-                        
-                        if output_size == 0:
-                            yield "출력 파일이 비어있습니다.".encode('utf-8')
-                            return
-                        
-                        print("=== 파일 전송 시작 ===")
-                        # 4단계: 파일 전송
-                        try:
-                            with open(temp_output, 'rb') as f:
-                                sent_bytes = 0
-                                while True:
-                                    chunk = f.read(8192)
-                                    if not chunk:
-                                        break
-                                    sent_bytes += len(chunk)
-                                    yield chunk
-                                print(f"전송 완료: {sent_bytes} bytes")
-                        except Exception as e:
-                            print(f"파일 전송 오류: {str(e)}")
-                            yield f"파일 전송 오류: {str(e)}".encode('utf-8')
-                        
-                    except subprocess.TimeoutExpired:
-                        error_msg = "처리 시간이 초과되었습니다."
-                        print(error_msg)
-                        yield error_msg.encode('utf-8')
-                    except Exception as e:
-                        error_msg = f"처리 중 오류 발생: {str(e)}"
-                        print(error_msg)
+                # 비디오/오디오를 동시에 받으면서 FFmpeg 출력(fragmented MP4)을 바로 전송
+                # (직접 URL이 없는 포맷은 SABR 세션 하나로 두 트랙을 함께 받음)
+                sent_bytes = 0
+                try:
+                    with metrics.span('send'):
+                        for chunk in merge_streams(*open_streams(video_stream, audio_stream)):
+                            sent_bytes += len(chunk)
+                            metrics.inc('ytdl_response_bytes_total', len(chunk))
+                            yield chunk
+                    logger.info("전송 완료: %d bytes", sent_bytes)
+                except Exception as e:
+                    error_msg = f"처리 중 오류 발생: {str(e)}"
+                    logger.error(error_msg)
+                    # 이미 영상 데이터를 보냈다면 오류 메시지를 덧붙이지 않음 (파일 손상 방지)
+                    if sent_bytes == 0:
                         yield error_msg.encode('utf-8')
             
             # 인코딩된 헤더 생성
@@ -282,6 +214,98 @@ def download():
         """
 
 
-# 로컬 테스트용 코드
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    params = request.get_json(silent=True) or request.form
+    url = params.get('url')
+    itag = params.get('itag')
+    audio_itag = params.get('audio_itag')
+    if not url or not itag or not audio_itag:
+        return jsonify({'error': 'url, itag, audio_itag 값이 필요합니다.'}), 400
+    try:
+        itag, audio_itag = int(itag), int(audio_itag)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'itag, audio_itag는 숫자여야 합니다.'}), 400
+
+    try:
+        yt = metadata_cache.get_youtube(urllib.parse.unquote(url))
+        video_stream = yt.streams.get_by_itag(itag)
+        audio_stream = yt.streams.get_by_itag(audio_itag)
+        if not video_stream or not audio_stream:
+            return jsonify({'error': '비디오 또는 오디오 스트림을 찾을 수 없습니다.'}), 404
+
+        filename = f"{safe_filename(yt.title)}_{video_stream.resolution}.mp4"
+        job = job_manager.submit(yt, video_stream, audio_stream, filename)
+    except JobQueueFull:
+        return jsonify({'error': '대기 중인 작업이 많습니다. 잠시 후 다시 시도해주세요.'}), 503, {'Retry-After': '30'}
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    result = job.to_dict()
+    result['status_url'] = f'/youtube-downloader/jobs/{job.id}'
+    result['file_url'] = f'/youtube-downloader/jobs/{job.id}/file'
+    return jsonify(result), 202
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': '작업을 찾을 수 없습니다.'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>/file')
+def job_file(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': '작업을 찾을 수 없습니다.'}), 404
+    if job.status != 'finished':
+        return jsonify(job.to_dict()), 409
+
+    path = job_manager.store.lookup(os.path.basename(job.path))
+    if path is None:
+        return jsonify({'error': '결과 파일이 만료되었습니다. 작업을 다시 요청해주세요.'}), 410
+    return send_media_file(path, headers={'Content-Disposition': encode_filename_for_header(job.filename)})
+
+
+@app.route('/batch', methods=['POST'])
+def batch_download():
+    # 재생목록/채널 URL 하나(url) 또는 URL 목록(urls: JSON 배열이나 줄바꿈 구분)을 받음
+    params = request.get_json(silent=True) or request.form
+    urls = params.get('urls') or []
+    if isinstance(urls, str):
+        urls = [line.strip() for line in urls.splitlines() if line.strip()]
+    if params.get('url'):
+        urls = [params['url']] + list(urls)
+    if not urls:
+        return jsonify({'error': 'url 또는 urls 값이 필요합니다.'}), 400
+    try:
+        max_height = int(params.get('max_height', 1080))
+    except ValueError:
+        return jsonify({'error': 'max_height는 숫자여야 합니다.'}), 400
+
+    def video_urls():
+        for url in urls:
+            yield from expand_urls(url)
+
+    downloader = BatchDownloader(
+        resolve=metadata_cache.get_youtube,
+        job_manager=job_manager,
+        filename_for=lambda yt, stream: f"{safe_filename(yt.title)}_{stream.resolution}.mp4",
+        workers=int(os.environ.get('BATCH_WORKERS', 3)),
+        max_height=max_height
+    )
+    return Response(
+        stream_with_context(downloader.generate(video_urls(), iter_ranges)),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': 'attachment; filename="youtube-batch.zip"',
+            'Cache-Control': 'no-cache'
+        }
+    )
+
+
+# 로컬 테스트용 코드 (프로젝트 루트에서 `python -m api.index`로 실행)
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,243 @@
+# api/jobs.py
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from api import metrics
+from api.merge import merge_to_file
+from api.sabr import open_streams
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_MAX_PENDING = 8
+DEFAULT_DOWNLOAD_WORKERS = 4
+DEFAULT_OUTPUT_MAX_BYTES = 4 * 1024 * 1024 * 1024
+# 메모리에 남겨둘 완료/실패 작업 수
+MAX_FINISHED_JOBS = 1000
+
+
+def output_key(video_id, video_itag, audio_itag):
+    """병합 결과를 구분하는 키 (작업 중복 제거와 결과 파일 이름에 사용)"""
+    return f'{video_id}_{video_itag}_{audio_itag}'
+
+
+class JobQueueFull(Exception):
+    """대기 중인 작업이 너무 많음 (잠시 후 다시 요청)"""
+
+
+class OutputStore:
+    """병합 결과 파일을 보관하는 크기 제한 LRU 디렉터리
+
+    마지막 사용 시각은 파일의 atime에 기록하므로 같은 디렉터리를 쓰는
+    다른 워커 프로세스와도 공유됩니다. (mtime은 ETag 계산에 쓰이므로 건드리지 않음)
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_OUTPUT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def lookup(self, name):
+        """파일이 있으면 사용 시각을 갱신하고 경로를 반환"""
+        path = self.path(name)
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except FileNotFoundError:
+            return None
+        return path
+
+    def temp_path(self, name):
+        return self.path(f'.{name}.{uuid.uuid4().hex}.part')
+
+    def commit(self, temp_path, name):
+        """완성된 임시 파일을 최종 이름으로 옮기고 한도를 넘으면 오래된 파일부터 삭제"""
+        path = self.path(name)
+        os.replace(temp_path, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.startswith('.') or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+
+class Job:
+    """병합 작업 하나의 상태"""
+
+    def __init__(self, key, filename):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.filename = filename
+        self.status = 'queued'
+        self.error = None
+        self.path = None
+        self.created = time.time()
+        self.finished = None
+        self.downloaded = 0
+        self.total_bytes = 0
+        self.merged_seconds = 0.0
+        self.duration = 0
+        self.done = threading.Event()
+
+    def progress(self):
+        """다운로드와 병합 진행률을 반씩 반영한 0~100 값"""
+        if self.status == 'finished':
+            return 100.0
+        download = self.downloaded / self.total_bytes if self.total_bytes else 0
+        merge = self.merged_seconds / self.duration if self.duration else 0
+        return round(min(download, 1.0) * 50 + min(merge, 1.0) * 50, 1)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'progress': self.progress(),
+            'downloaded_bytes': self.downloaded,
+            'total_bytes': self.total_bytes,
+            'merged_seconds': round(self.merged_seconds, 1),
+            'duration': self.duration,
+            'filename': self.filename,
+            'error': self.error,
+        }
+
+
+class JobManager:
+    """병합 작업을 요청 스레드 밖의 제한된 워커 풀에서 실행
+
+    같은 (영상 ID, 비디오 itag, 오디오 itag) 요청은 하나의 작업을 공유하고,
+    이미 병합된 파일이 있으면 바로 완료 상태의 작업을 돌려줍니다.
+    """
+
+    def __init__(self, store, max_workers=DEFAULT_MAX_WORKERS, max_pending=DEFAULT_MAX_PENDING,
+                 download_workers=DEFAULT_DOWNLOAD_WORKERS):
+        self.store = store
+        self.max_pending = max_pending
+        self.download_workers = download_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='merge-job')
+        self._jobs = {}
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def submit(self, yt, video_stream, audio_stream, filename):
+        key = output_key(yt.video_id, video_stream.itag, audio_stream.itag)
+        with self._lock:
+            job = self._active.get(key)
+            if job is not None:
+                return job
+
+            job = Job(key, filename)
+            cached = self.store.lookup(f'{key}.mp4')
+            if cached:
+                job.status = 'finished'
+                job.path = cached
+                job.finished = time.time()
+                job.done.set()
+                self._remember(job)
+                return job
+
+            if len(self._active) >= self.max_pending:
+                raise JobQueueFull()
+            self._active[key] = job
+            self._remember(job)
+
+        job.duration = yt.length or 0
+        self._executor.submit(self._run, job, video_stream, audio_stream)
+        return job
+
+    def _remember(self, job):
+        self._jobs[job.id] = job
+        if len(self._jobs) > MAX_FINISHED_JOBS + self.max_pending:
+            done = [j for j in self._jobs.values() if j.finished is not None]
+            for old in sorted(done, key=lambda j: j.finished)[:len(self._jobs) - MAX_FINISHED_JOBS]:
+                del self._jobs[old.id]
+
+    def _counted(self, job, chunks):
+        for chunk in chunks:
+            job.downloaded += len(chunk)
+            yield chunk
+
+    def _run(self, job, video_stream, audio_stream):
+        job.status = 'running'
+        job.total_bytes = (video_stream.filesize or 0) + (audio_stream.filesize or 0)
+        temp_path = self.store.temp_path(f'{job.key}.mp4')
+
+        def on_progress(seconds):
+            job.merged_seconds = seconds
+
+        try:
+            logger.info("작업 시작: %s (%s)", job.id, job.key)
+            with metrics.span('job'):
+                video_chunks, audio_chunks = open_streams(video_stream, audio_stream,
+                                                          workers=self.download_workers)
+                merge_to_file(
+                    self._counted(job, video_chunks),
+                    self._counted(job, audio_chunks),
+                    temp_path,
+                    on_progress
+                )
+            job.path = self.store.commit(temp_path, f'{job.key}.mp4')
+            job.status = 'finished'
+            logger.info("작업 완료: %s", job.id)
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            logger.error("작업 실패 (%s): %s", job.id, e)
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                self._active.pop(job.key, None)
+            job.done.set()
+
+
+def create_job_manager():
+    """환경 변수 설정에 따라 작업 관리자 생성
+
+    JOB_WORKERS: 동시에 실행할 병합 작업 수
+    JOB_MAX_PENDING: 대기+실행 중 작업 한도 (넘으면 503)
+    JOB_DOWNLOAD_WORKERS: 작업 하나의 스트림별 동시 구간 다운로드 수
+    JOB_OUTPUT_DIR / JOB_OUTPUT_MAX_BYTES: 결과 파일 디렉터리와 최대 크기
+    """
+    store = OutputStore(
+        os.environ.get('JOB_OUTPUT_DIR', os.path.join(tempfile.gettempdir(), 'youtube-downloader-output')),
+        int(os.environ.get('JOB_OUTPUT_MAX_BYTES', DEFAULT_OUTPUT_MAX_BYTES))
+    )
+    return JobManager(
+        store,
+        max_workers=int(os.environ.get('JOB_WORKERS', DEFAULT_MAX_WORKERS)),
+        max_pending=int(os.environ.get('JOB_MAX_PENDING', DEFAULT_MAX_PENDING)),
+        download_workers=int(os.environ.get('JOB_DOWNLOAD_WORKERS', DEFAULT_DOWNLOAD_WORKERS))
+    )
@@ -0,0 +1,166 @@
+# api/merge.py
+import contextlib
+import logging
+import os
+import subprocess
+import threading
+import time
+
+from api import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# FFmpeg 출력 파이프에서 한 번에 읽어 클라이언트로 보낼 최대 크기
+OUTPUT_CHUNK_SIZE = 64 * 1024
+# FFmpeg가 끝난 뒤 입력/stderr 스레드가 정리되기를 기다리는 최대 시간(초)
+FEED_JOIN_TIMEOUT = 10
+
+
+class MergeError(Exception):
+    """FFmpeg 병합 실패"""
+
+
+def _feed(chunks, fd, stop_event, errors, parent):
+    """청크 이터레이터의 내용을 파이프에 기록 (별도 스레드에서 실행)"""
+    try:
+        with metrics.span('download', parent=parent), os.fdopen(fd, 'wb') as pipe:
+            for chunk in chunks:
+                if stop_event.is_set():
+                    break
+                pipe.write(chunk)
+    except BrokenPipeError:
+        # FFmpeg가 먼저 종료된 경우 (클라이언트 연결 종료 등)
+        pass
+    except Exception as e:
+        errors.append(e)
+
+
+def _drain(pipe, lines):
+    """FFmpeg stderr가 가득 차서 멈추지 않도록 계속 읽어둠"""
+    for line in pipe:
+        lines.append(line.decode('utf-8', 'replace').rstrip())
+
+
+@contextlib.contextmanager
+def _ffmpeg(video_chunks, audio_chunks, output_args):
+    """FFmpeg 실행 전체를 'ffmpeg' 단계로 기록"""
+    with metrics.span('ffmpeg') as span:
+        with _ffmpeg_process(video_chunks, audio_chunks, output_args, span) as process:
+            yield process
+
+
+@contextlib.contextmanager
+def _ffmpeg_process(video_chunks, audio_chunks, output_args, span):
+    """두 입력을 각각의 스레드에서 파이프로 공급하는 FFmpeg 프로세스를 실행
+
+    비디오는 stdin, 오디오는 별도 파이프로 전달합니다. with 블록 안에서는
+    프로세스의 stdout을 읽을 수 있고, 블록을 벗어나면 프로세스와 스레드를
+    정리합니다. 정상 종료 시 입력 오류나 FFmpeg 오류가 있으면 MergeError 발생.
+    """
+    audio_read, audio_write = os.pipe()
+    cmd = [
+        'ffmpeg',
+        '-hide_banner',
+        '-loglevel', 'error',
+        '-i', 'pipe:0',
+        '-i', f'pipe:{audio_read}',
+        '-map', '0:v:0',
+        '-map', '1:a:0',
+        '-c:v', 'copy',
+        '-c:a', 'copy',
+    ] + output_args
+    logger.debug("FFmpeg 명령어: %s", ' '.join(cmd))
+
+    try:
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            pass_fds=(audio_read,)
+        )
+    except Exception:
+        os.close(audio_write)
+        raise
+    finally:
+        # 읽기 쪽은 FFmpeg 프로세스만 가지고 있어야 EOF가 정상 전달됨
+        os.close(audio_read)
+
+    stop_event = threading.Event()
+    errors = []
+    stderr_lines = []
+    threads = [
+        threading.Thread(target=_feed, args=(video_chunks, os.dup(process.stdin.fileno()), stop_event, errors, span), daemon=True),
+        threading.Thread(target=_feed, args=(audio_chunks, audio_write, stop_event, errors, span), daemon=True),
+        threading.Thread(target=_drain, args=(process.stderr, stderr_lines), daemon=True),
+    ]
+    process.stdin.close()
+    for thread in threads:
+        thread.start()
+
+    try:
+        yield process
+
+        process.wait()
+        # FFmpeg가 먼저 끝나면 입력 스레드가 다음 청크를 기다리며 멈춰 있을 수 있음
+        stop_event.set()
+        deadline = time.monotonic() + FEED_JOIN_TIMEOUT
+        for thread in threads:
+            thread.join(timeout=max(deadline - time.monotonic(), 0))
+        if process.returncode == 0 and any(thread.is_alive() for thread in threads):
+            raise MergeError("입력 스트림이 끝나지 않았습니다.")
+        if errors:
+            raise MergeError(f"스트림 다운로드 오류: {errors[0]}")
+        if process.returncode != 0:
+            raise MergeError(f"FFmpeg 오류 (코드: {process.returncode}): {' '.join(stderr_lines)}")
+    finally:
+        # 클라이언트 연결이 끊기거나 작업이 중단된 경우에도 프로세스와 스레드 정리
+        stop_event.set()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        deadline = time.monotonic() + FEED_JOIN_TIMEOUT
+        for thread in threads:
+            thread.join(timeout=max(deadline - time.monotonic(), 0))
+
+
+def merge_streams(video_chunks, audio_chunks):
+    """비디오/오디오 청크를 FFmpeg로 병합하면서 fragmented MP4 청크를 바로 생성
+
+    출력은 파일을 거치지 않고 stdout에서 바로 읽습니다.
+    """
+    output_args = [
+        '-f', 'mp4',
+        # moov를 앞에 두고 키프레임 단위로 조각내야 탐색 없이 바로 전송 가능
+        '-movflags', 'frag_keyframe+empty_moov+default_base_moof',
+        'pipe:1'
+    ]
+    with _ffmpeg(video_chunks, audio_chunks, output_args) as process:
+        stdout_fd = process.stdout.fileno()
+        while True:
+            chunk = os.read(stdout_fd, OUTPUT_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def merge_to_file(video_chunks, audio_chunks, output_path, on_progress=None):
+    """비디오/오디오 청크를 병합하여 파일로 저장
+
+    on_progress(seconds)는 FFmpeg -progress 출력의 out_time 값(초)으로 호출됩니다.
+    """
+    output_args = [
+        '-f', 'mp4',
+        '-movflags', 'faststart',
+        '-progress', 'pipe:1',
+        '-nostats',
+        '-y',
+        output_path
+    ]
+    with _ffmpeg(video_chunks, audio_chunks, output_args) as process:
+        for line in process.stdout:
+            key, _, value = line.decode('utf-8', 'replace').strip().partition('=')
+            if key == 'out_time_us' and on_progress and value.isdigit():
+                on_progress(int(value) / 1_000_000)
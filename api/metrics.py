@@ -0,0 +1,140 @@
+# api/metrics.py
+import contextlib
+import logging
+import os
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# 단계별 소요 시간 히스토그램 구간(초)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class Span:
+    """한 단계의 시작/종료 시각과 하위 단계를 담는 구간"""
+
+    def __init__(self, stage, parent=None):
+        self.stage = stage
+        self.parent = parent
+        self.children = []
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = None
+        if parent is not None:
+            parent.children.append(self)
+
+    def tree(self):
+        """(단계 이름, [하위 트리...]) 형태로 반환 (디버깅/검증용)"""
+        return (self.stage, [child.tree() for child in self.children])
+
+
+class Registry:
+    """카운터, 게이지, 히스토그램을 보관하고 Prometheus 텍스트 형식으로 출력"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def _gauge_add(self, name, value, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + value
+
+    def _observe(self, name, value, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            counts, total, count = self._histograms.get(key, ([0] * len(DURATION_BUCKETS), 0.0, 0))
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    counts[i] += 1
+            self._histograms[key] = (counts, total + value, count + 1)
+
+    def current_span(self):
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    @contextlib.contextmanager
+    def _span(self, stage, parent):
+        if parent is None:
+            parent = self.current_span()
+        span = Span(stage, parent)
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(span)
+        self._gauge_add('ytdl_stage_in_flight', 1, {'stage': stage})
+        try:
+            yield span
+        except BaseException as e:
+            if not isinstance(e, GeneratorExit):
+                span.error = e
+                self.inc('ytdl_stage_errors_total', stage=stage)
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.start
+            stack.remove(span)
+            self._gauge_add('ytdl_stage_in_flight', -1, {'stage': stage})
+            self._observe('ytdl_stage_duration_seconds', span.duration, {'stage': stage})
+            logger.debug("단계 %s: %.3fs%s", stage, span.duration, ' (오류)' if span.error else '')
+
+    def span(self, stage, parent=None):
+        """단계 하나의 소요 시간, 진행 중 개수, 오류 수를 기록하는 컨텍스트 매니저
+
+        parent를 지정하지 않으면 같은 스레드에서 열려 있는 구간의 하위 구간이 됩니다.
+        비활성화 상태에서는 아무 일도 하지 않는 컨텍스트를 돌려줍니다.
+        """
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._span(stage, parent)
+
+    def render(self):
+        """Prometheus 텍스트 형식 출력"""
+        def fmt_labels(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ''
+            return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}'
+
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(self._histograms.items())
+
+        seen = set()
+        for kind, items in (('counter', counters), ('gauge', gauges)):
+            for (name, labels), value in items:
+                if name not in seen:
+                    lines.append(f'# TYPE {name} {kind}')
+                    seen.add(name)
+                lines.append(f'{name}{fmt_labels(labels)} {value}')
+        for (name, labels), (counts, total, count) in histograms:
+            if name not in seen:
+                lines.append(f'# TYPE {name} histogram')
+                seen.add(name)
+            for bound, bucket_count in zip(DURATION_BUCKETS, counts):
+                lines.append(f'{name}_bucket{fmt_labels(labels, [("le", bound)])} {bucket_count}')
+            lines.append(f'{name}_bucket{fmt_labels(labels, [("le", "+Inf")])} {count}')
+            lines.append(f'{name}_sum{fmt_labels(labels)} {total}')
+            lines.append(f'{name}_count{fmt_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+# 프로세스 전체에서 공유하는 레지스트리 (METRICS_ENABLED=0 이면 비활성화)
+registry = Registry(enabled=os.environ.get('METRICS_ENABLED', '1') != '0')
+span = registry.span
+inc = registry.inc
+current_span = registry.current_span
@@ -0,0 +1,260 @@
+# api/player_cache.py
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import pytubefix
+from pytubefix import YouTube, extract, request as yt_request
+from pytubefix.cipher import Cipher, get_initial_function_name, get_throttling_function_name
+from pytubefix.exceptions import InterpretationError
+from pytubefix.jsinterp import JSInterpreter
+
+from api import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# 프로세스 안에 유지할 플레이어 버전 수와 플레이어별로 기억할 변환 결과 수
+MAX_PLAYERS = 4
+MAX_MEMO = 512
+# 변환 결과를 디스크에 다시 쓰는 최소 간격(초). 스트림마다 파일을 쓰지 않도록 함
+SAVE_INTERVAL = 5
+
+
+class CachedCipher(Cipher):
+    """함수 이름 탐색을 건너뛰고 n/서명 변환 결과를 기억하는 Cipher
+
+    JSInterpreter.call_function은 호출할 때마다 base.js 전체에서 함수를 다시
+    찾으므로, 한 번 만든 함수를 인스턴스에 보관해 두고 같은 플레이어를 쓰는
+    요청끼리 이 객체를 공유합니다.
+    """
+
+    def __init__(self, js, js_url, plan, on_update):
+        self.js_url = js_url
+        self.signature_function_name = plan['signature_function_name']
+        self.throttling_function_name = plan['throttling_function_name']
+        self.calculated_n = None
+        self.js_interpreter = JSInterpreter(js)
+        self._functions = {}
+        self._memo = {
+            'n': OrderedDict(plan.get('n', {})),
+            'sig': OrderedDict(plan.get('sig', {})),
+        }
+        self._on_update = on_update
+        self._lock = threading.Lock()
+
+    def _function(self, name):
+        # 해석된 함수는 호출 사이에 상태를 공유하므로 _lock 안에서만 호출
+        function = self._functions.get(name)
+        if function is None:
+            function = self._functions[name] = self.js_interpreter.extract_function(name)
+        return function
+
+    def _interpret(self, name, value):
+        try:
+            return self._function(name)((value,))
+        except Exception:
+            raise InterpretationError(js_url=self.js_url)
+
+    def _memoized(self, kind, value, name):
+        memo = self._memo[kind]
+        with self._lock:
+            if value in memo:
+                metrics.inc('ytdl_cipher_memo_total', kind=kind, result='hit')
+                return memo[value]
+            metrics.inc('ytdl_cipher_memo_total', kind=kind, result='miss')
+            with metrics.span(f'cipher_{kind}'):
+                result = self._interpret(name, value)
+            memo[value] = result
+            while len(memo) > MAX_MEMO:
+                memo.popitem(last=False)
+        self._on_update(self)
+        return result
+
+    def get_throttling(self, n):
+        return self._memoized('n', n, self.throttling_function_name)
+
+    def get_signature(self, ciphered_signature):
+        return self._memoized('sig', ciphered_signature, self.signature_function_name)
+
+    def warm_up(self):
+        """서명/n 함수를 미리 찾아 해석해 둠"""
+        with self._lock:
+            for name in (self.signature_function_name, self.throttling_function_name):
+                self._function(name)
+
+    def plan(self):
+        with self._lock:
+            return {
+                'js_url': self.js_url,
+                'signature_function_name': self.signature_function_name,
+                'throttling_function_name': self.throttling_function_name,
+                'n': dict(self._memo['n']),
+                'sig': dict(self._memo['sig']),
+            }
+
+
+class PlayerCache:
+    """플레이어 URL 해시를 키로 base.js와 변환 정보를 디스크에 보관
+
+    <hash>.js   : 플레이어 JS 원문
+    <hash>.json : 서명/n 함수 이름과 변환 결과
+    재시작하거나 다른 워커에서도 정규식 탐색과 JS 다운로드를 다시 하지 않습니다.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._js = OrderedDict()
+        self._ciphers = OrderedDict()
+        self._saved = {}
+        self._lock = threading.Lock()
+
+    def _path(self, js_url, suffix):
+        digest = hashlib.sha256(js_url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + suffix)
+
+    def _write(self, path, text):
+        # 다른 워커가 쓰는 중인 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체
+        fd, temp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def _remember(cache, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > MAX_PLAYERS:
+            cache.popitem(last=False)
+
+    def js(self, js_url):
+        """메모리 → 디스크 → 네트워크 순서로 플레이어 JS를 찾음"""
+        with self._lock:
+            if js_url in self._js:
+                self._js.move_to_end(js_url)
+                return self._js[js_url]
+
+        path = self._path(js_url, '.js')
+        try:
+            with open(path, encoding='utf-8') as f:
+                js = f.read()
+        except FileNotFoundError:
+            with metrics.span('player_js'):
+                js = yt_request.get(js_url)
+            self._write(path, js)
+
+        with self._lock:
+            self._remember(self._js, js_url, js)
+        return js
+
+    def cipher(self, js, js_url):
+        """플레이어별로 하나의 CachedCipher를 만들어 재사용"""
+        with self._lock:
+            if js_url in self._ciphers:
+                self._ciphers.move_to_end(js_url)
+                return self._ciphers[js_url]
+
+        path = self._path(js_url, '.json')
+        try:
+            with open(path, encoding='utf-8') as f:
+                plan = json.load(f)
+        except (FileNotFoundError, ValueError):
+            with metrics.span('cipher_init'):
+                plan = {
+                    'js_url': js_url,
+                    'signature_function_name': get_initial_function_name(js, js_url),
+                    'throttling_function_name': get_throttling_function_name(js, js_url),
+                }
+            self._write(path, json.dumps(plan))
+
+        cipher = CachedCipher(js, js_url, plan, self._save_plan)
+        with self._lock:
+            self._remember(self._ciphers, js_url, cipher)
+        return cipher
+
+    def _save_plan(self, cipher):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._saved.get(cipher.js_url, 0) < SAVE_INTERVAL:
+                return
+            self._saved[cipher.js_url] = now
+        try:
+            self._write(self._path(cipher.js_url, '.json'), json.dumps(cipher.plan()))
+        except OSError as e:
+            logger.warning("플레이어 캐시 저장 실패: %s", e)
+
+    def preload(self):
+        """디스크에 남은 최근 플레이어들을 메모리에 올리고 서명/n 함수를 미리 해석
+
+        JS 파일이 없는 플레이어는 건너뛰므로 네트워크 요청은 하지 않습니다.
+        반환값: 불러온 플레이어 수
+        """
+        plans = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                path = os.path.join(self.directory, name)
+                plans.append((os.path.getmtime(path), path))
+
+        loaded = 0
+        # 오래된 것부터 불러와야 가장 최근 플레이어가 LRU의 맨 뒤에 남음
+        for _, path in sorted(plans)[-MAX_PLAYERS:]:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    js_url = json.load(f).get('js_url')
+                if not js_url or not os.path.exists(self._path(js_url, '.js')):
+                    continue
+                self.cipher(self.js(js_url), js_url).warm_up()
+                loaded += 1
+            except Exception as e:
+                logger.warning("플레이어 미리 불러오기 실패 (%s): %s", path, e)
+        return loaded
+
+    def forget(self, js_url):
+        """JS가 더 이상 동작하지 않을 때 (ExtractError) 캐시에서 제거"""
+        with self._lock:
+            self._js.pop(js_url, None)
+            self._ciphers.pop(js_url, None)
+        for suffix in ('.js', '.json'):
+            try:
+                os.remove(self._path(js_url, suffix))
+            except FileNotFoundError:
+                pass
+
+
+def install(cache):
+    """pytubefix가 플레이어 JS와 Cipher를 만들 때 이 캐시를 거치도록 연결"""
+
+    def js(self):
+        if self._js:
+            return self._js
+        # 이미 JS를 건넨 객체가 다시 요청하는 것은 pytubefix가 ExtractError 뒤 _js를
+        # 비우고 재시도하는 경우뿐이므로, 그때 건넸던 플레이어를 캐시에서 제거
+        served = getattr(self, '_player_cache_js_url', None)
+        if served is not None:
+            cache.forget(served)
+        js_url = self.js_url
+        self._js = cache.js(js_url)
+        self._player_cache_js_url = js_url
+        pytubefix.__js__ = self._js
+        pytubefix.__js_url__ = js_url
+        return self._js
+
+    YouTube.js = property(js)
+    extract.Cipher = cache.cipher
+
+
+def create_player_cache():
+    """PLAYER_CACHE_DIR 환경 변수(기본값: 임시 디렉터리)에 캐시를 만들고 연결"""
+    directory = os.environ.get(
+        'PLAYER_CACHE_DIR',
+        os.path.join(tempfile.gettempdir(), 'youtube-downloader-player')
+    )
+    cache = PlayerCache(directory)
+    install(cache)
+    return cache
@@ -0,0 +1,561 @@
+# api/sabr.py
+import base64
+import contextlib
+import http.client
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import types
+import urllib.parse
+import uuid
+from collections import deque
+
+from api import metrics
+from api.downloader import DEFAULT_WORKERS, HEADERS, iter_ranges, pool
+from api.merge import merge_to_file
+
+
+logger = logging.getLogger(__name__)
+
+# UMP 파트 종류 (pytubefix.sabr.core.server_abr_stream.PART 중 사용하는 것만)
+PART_MEDIA_HEADER = 20
+PART_MEDIA = 21
+PART_MEDIA_END = 22
+PART_NEXT_REQUEST_POLICY = 35
+PART_FORMAT_INITIALIZATION_METADATA = 42
+PART_SABR_REDIRECT = 43
+PART_SABR_ERROR = 44
+PART_RELOAD_PLAYER_RESPONSE = 46
+
+# 트랙(비디오/오디오)마다 소비자보다 앞서 메모리에 쌓아둘 수 있는 최대 크기
+DEFAULT_BUFFER_BYTES = 32 * 1024 * 1024
+# 새 데이터 없는 응답이 이만큼 이어지면 스트리밍 URL을 새로 받음
+MAX_STALLS = 3
+MAX_RELOADS = 3
+
+# SABR_MODE: auto(직접 URL이 없는 포맷만), prefer(가능하면 항상), off(사용 안 함)
+SABR_MODE = os.environ.get('SABR_MODE', 'auto').lower()
+
+CLIENT_INFO = {
+    'clientName': 1,
+    'clientVersion': '2.20250523.01.00',
+    'osName': 'Windows',
+    'osVersion': '10.0',
+    'platform': 'DESKTOP'
+}
+
+
+class SabrStreamError(Exception):
+    """SABR 세션 실패"""
+
+
+class _SessionClosed(Exception):
+    """소비자가 모두 떠나 세션을 중단"""
+
+
+def _base64_bytes(value):
+    value = value.replace('-', '+').replace('_', '/')
+    return base64.b64decode(value + '=' * (-len(value) % 4))
+
+
+def streaming_url(video_stream, audio_stream):
+    """SABR 스트리밍 URL. 직접 URL이 있는 포맷이면 플레이어 응답에서 얻음 (없으면 None)"""
+    for stream in (video_stream, audio_stream):
+        if stream.is_sabr:
+            return stream.url
+    youtube = getattr(video_stream._monostate, 'youtube', None)
+    return youtube.server_abr_streaming_url if youtube is not None else None
+
+
+def _read_varint(read):
+    """UMP 가변 길이 정수. 첫 바이트 앞쪽 비트로 길이를 판단 (스트림 끝이면 None)"""
+    first = read(1)
+    if not first:
+        return None
+    first = first[0]
+    if first < 128:
+        return first
+    length = 2 if first < 192 else 3 if first < 224 else 4 if first < 240 else 5
+    rest = read(length - 1)
+    if len(rest) < length - 1:
+        raise http.client.IncompleteRead(rest, length - 1 - len(rest))
+    if length == 5:
+        return int.from_bytes(rest, 'little')
+    value = first & (0xFF >> length)
+    for i, byte in enumerate(rest):
+        value += byte << (8 - length + 8 * i)
+    return value
+
+
+def iter_ump_parts(response):
+    """응답을 읽으면서 UMP 파트를 (종류, 내용)으로 하나씩 생성
+
+    응답 전체를 모으지 않으므로 미디어 파트는 도착하는 대로 처리할 수 있습니다.
+    """
+    read = response.read
+    while True:
+        part_type = _read_varint(read)
+        if part_type is None:
+            return
+        size = _read_varint(read)
+        if size is None:
+            raise http.client.IncompleteRead(b'', 1)
+        data = read(size) if size else b''
+        if len(data) < size:
+            raise http.client.IncompleteRead(data, size - len(data))
+        yield part_type, data
+
+
+@contextlib.contextmanager
+def post(url, body, redirects=5):
+    """SABR 요청을 keep-alive 연결 풀로 보내고 응답을 돌려줌"""
+    for _ in range(redirects + 1):
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path + (f'?{parts.query}' if parts.query else '')
+        headers = dict(HEADERS, **{'Content-Type': 'application/x-protobuf'})
+        conn = pool.acquire(parts.scheme, parts.netloc)
+        try:
+            conn.request('POST', path, body=body, headers=headers)
+            response = conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            conn = pool.connect(parts.scheme, parts.netloc)
+            conn.request('POST', path, body=body, headers=headers)
+            response = conn.getresponse()
+
+        if response.status in (301, 302, 303, 307, 308):
+            url = urllib.parse.urljoin(url, response.getheader('Location'))
+            response.read()
+            pool.release(parts.scheme, parts.netloc, conn)
+            continue
+        if response.status != 200:
+            response.read()
+            conn.close()
+            raise SabrStreamError(f"HTTP {response.status}")
+        try:
+            yield response
+        except BaseException:
+            conn.close()
+            raise
+        if response.isclosed():
+            pool.release(parts.scheme, parts.netloc, conn)
+        else:
+            conn.close()
+        return
+    raise SabrStreamError("리다이렉트가 너무 많습니다.")
+
+
+class ReplayFetcher:
+    """record_dir에 저장해둔 응답(000000.ump, 000001.ump, ...)을 순서대로 돌려주는 fetch
+
+    실제 서버 없이 같은 응답을 파서와 병합 파이프라인에 다시 흘려보낼 때 사용합니다.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.requests = 0
+
+    def __call__(self, url, body):
+        path = os.path.join(self.directory, f'{self.requests:06d}.ump')
+        self.requests += 1
+        if not os.path.exists(path):
+            raise SabrStreamError(f"기록된 응답이 없습니다: {path}")
+        return open(path, 'rb')
+
+
+# 재생에 필요한 스트림 속성 (기록 시 streams.json에 저장)
+STREAM_FIELDS = ('itag', 'resolution', 'is_drc', 'last_Modified', 'xtags', 'filesize',
+                 'video_playback_ustreamer_config', 'po_token')
+
+
+class _Recorder:
+    """응답을 읽는 그대로 파일에도 기록"""
+
+    def __init__(self, response, path):
+        self.response = response
+        self.file = open(path, 'wb')
+
+    def read(self, size):
+        data = self.response.read(size)
+        self.file.write(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+class _Track:
+    """한 트랙의 출력 버퍼와 진행 상태"""
+
+    def __init__(self, kind, stream):
+        self.kind = kind
+        self.stream = stream
+        self.chunks = deque()
+        self.buffered = 0
+        # offset: 지금까지 내보낸 바이트 수, position: 다음에 받을 바이트의 원본 파일 위치
+        # (SABR는 인덱스(sidx) 구간을 보내지 않으므로 둘이 다를 수 있음)
+        self.offset = 0
+        self.position = 0
+        self.segment_end = 0
+        self.format_id = None
+        self.sequence_count = None
+        self.init_done = False
+        self.last_sequence = 0
+        self.end_ms = 0
+        self.finished = False
+
+    @property
+    def complete(self):
+        return self.sequence_count is not None and self.last_sequence >= self.sequence_count
+
+
+class SabrSession:
+    """비디오와 오디오를 하나의 SABR 세션으로 함께 받아 트랙별 청크로 분리
+
+    응답의 UMP 파트를 읽는 대로 트랙 버퍼에 넣고, 각 트랙은 chunks()로 꺼내
+    FFmpeg 입력 파이프에 바로 씁니다. 세션 자체는 첫 소비자가 읽기 시작할 때
+    별도 스레드에서 시작됩니다.
+
+    fetch(url, body)는 응답(read(size)를 가진 컨텍스트 매니저)을 돌려주는 함수로,
+    기본값은 실제 서버에 POST하고 ReplayFetcher를 쓰면 기록된 응답을 재생합니다.
+    record_dir을 지정하면 받은 응답을 그 디렉터리에 순서대로 저장합니다.
+    """
+
+    def __init__(self, video_stream, audio_stream, url=None, fetch=post, record_dir=None,
+                 buffer_bytes=DEFAULT_BUFFER_BYTES):
+        self.fetch = fetch
+        self.record_dir = record_dir
+        self.buffer_bytes = buffer_bytes
+        self.tracks = {
+            video_stream.itag: _Track('video', video_stream),
+            audio_stream.itag: _Track('audio', audio_stream),
+        }
+        self.video = self.tracks[video_stream.itag]
+        self.audio = self.tracks[audio_stream.itag]
+        self.url = url or streaming_url(video_stream, audio_stream)
+        self.ustreamer_config = video_stream.video_playback_ustreamer_config
+        self.po_token = video_stream.po_token
+        self.youtube = getattr(video_stream._monostate, 'youtube', None)
+        self.requests = 0
+        self.error = None
+        self._headers = {}
+        self._playback_cookie = None
+        self._closed = False
+        self._thread = None
+        self._cond = threading.Condition()
+        if record_dir:
+            os.makedirs(record_dir, exist_ok=True)
+            with open(os.path.join(record_dir, 'streams.json'), 'w') as f:
+                json.dump({kind: {name: getattr(stream, name) for name in STREAM_FIELDS}
+                           for kind, stream in (('video', video_stream), ('audio', audio_stream))}, f)
+
+    # 소비자 쪽
+
+    def chunks(self, kind, workers=DEFAULT_WORKERS):
+        """트랙 하나의 바이트 청크를 생성
+
+        세션이 실패하면 직접 URL이 있는 포맷에 한해 지금까지 받은 원본 파일
+        위치(track.position)부터 구간 다운로드(iter_ranges)로 이어서 받습니다.
+        """
+        track = self.video if kind == 'video' else self.audio
+        completed = False
+        try:
+            self._start()
+            while True:
+                with self._cond:
+                    while (not track.chunks and not track.finished and self.error is None
+                           and not self._closed):
+                        self._cond.wait()
+                    if self._closed:
+                        # 다른 트랙의 소비자가 떠나 세션이 닫힘 (병합이 이미 중단된 상태)
+                        raise SabrStreamError("SABR 세션이 닫혔습니다.")
+                    if not track.chunks:
+                        break
+                    data = track.chunks.popleft()
+                    track.buffered -= len(data)
+                    self._cond.notify_all()
+                yield data
+            # 마지막 구간까지 받은 뒤 실패했다면 더 받을 것이 없음
+            if not track.finished and (not track.stream.filesize or track.position < track.stream.filesize):
+                self._fall_back(track)
+                yield from iter_ranges(track.stream.url, workers=workers, start=track.position)
+            completed = True
+        finally:
+            if not completed:
+                self.close()
+
+    def _fall_back(self, track):
+        if track.stream.is_sabr:
+            raise SabrStreamError(f"SABR 다운로드 실패: {self.error}") from self.error
+        logger.warning("SABR 실패, 구간 다운로드로 전환 (%s itag=%s, 파일 위치 %d부터): %s",
+                       track.kind, track.stream.itag, track.position, self.error)
+        metrics.inc('ytdl_sabr_fallbacks_total', track=track.kind)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(metrics.current_span(),),
+                                            name='sabr', daemon=True)
+            self._thread.start()
+
+    # 생산자 쪽
+
+    def _run(self, parent):
+        try:
+            with metrics.span('sabr', parent=parent):
+                self._stream()
+        except _SessionClosed:
+            with self._cond:
+                self.error = SabrStreamError("소비자가 떠나 SABR 세션을 중단했습니다.")
+                self._cond.notify_all()
+        except Exception as e:
+            logger.debug("SABR 세션 오류: %s", e)
+            with self._cond:
+                self.error = e
+                self._cond.notify_all()
+
+    def _put(self, track, data):
+        if track.position + len(data) > track.segment_end:
+            raise SabrStreamError(f"구간 길이를 넘는 데이터입니다 ({track.kind} {track.position}+{len(data)})")
+        with self._cond:
+            while track.buffered >= self.buffer_bytes and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                raise _SessionClosed()
+            track.chunks.append(data)
+            track.buffered += len(data)
+            track.offset += len(data)
+            track.position += len(data)
+            self._cond.notify_all()
+        metrics.inc('ytdl_download_bytes_total', len(data))
+
+    def _stream(self):
+        stalls = 0
+        reloads = 0
+        while not (self.video.complete and self.audio.complete):
+            progressed, reload = self._request()
+            if reload or not progressed:
+                stalls = 0 if reload else stalls + 1
+                if reload or stalls >= MAX_STALLS:
+                    reloads += 1
+                    if reloads > MAX_RELOADS:
+                        raise SabrStreamError("스트리밍 URL 갱신 횟수를 초과했습니다.")
+                    self._reload()
+            else:
+                stalls = 0
+        with self._cond:
+            for track in self.tracks.values():
+                track.finished = True
+            self._cond.notify_all()
+
+    def _request_body(self):
+        # 프로토콜 모듈은 pytubefix 전체를 불러오므로 SABR 세션을 실제로 쓸 때 가져옴
+        from pytubefix.sabr.video_streaming.playback_cookie import PlaybackCookie
+        from pytubefix.sabr.video_streaming.video_playback_abr_request import VideoPlaybackAbrRequest
+
+        video, audio = self.video.stream, self.audio.stream
+        height = int(video.resolution.rstrip('p')) if video.resolution else 720
+        # 이미 받은 트랙보다 앞선 위치는 다시 받을 필요가 없음
+        player_time = min((t.end_ms for t in self.tracks.values() if not t.complete), default=0)
+        known = [t for t in self.tracks.values() if t.format_id is not None]
+        return bytes(VideoPlaybackAbrRequest.encode({
+            'clientAbrState': {
+                'lastManualDirection': 0,
+                'timeSinceLastManualFormatSelectionMs': 0,
+                'lastManualSelectedResolution': height,
+                'stickyResolution': height,
+                'playerTimeMs': player_time,
+                'visibility': 0,
+                'drcEnabled': audio.is_drc,
+                # 0 = 비디오와 오디오를 한 세션에서 함께
+                'enabledTrackTypesBitfield': 0
+            },
+            'selectedAudioFormatIds': [self._format_selection(audio)],
+            'selectedVideoFormatIds': [self._format_selection(video)],
+            'selectedFormatIds': [t.format_id for t in known],
+            'videoPlaybackUstreamerConfig': _base64_bytes(self.ustreamer_config),
+            'streamerContext': {
+                'field5': [],
+                'field6': [],
+                'poToken': _base64_bytes(self.po_token) if self.po_token else None,
+                'playbackCookie': (PlaybackCookie.encode(self._playback_cookie).finish()
+                                   if self._playback_cookie else None),
+                'clientInfo': CLIENT_INFO
+            },
+            'bufferedRanges': [{
+                'formatId': t.format_id,
+                'startTimeMs': 0,
+                'durationMs': t.end_ms,
+                'startSegmentIndex': 1,
+                'endSegmentIndex': t.last_sequence
+            } for t in known if t.last_sequence],
+            'field1000': []
+        }).finish())
+
+    @staticmethod
+    def _format_selection(stream):
+        return {'itag': stream.itag, 'lastModified': int(stream.last_Modified), 'xtags': stream.xtags}
+
+    def _request(self):
+        """요청 하나를 보내고 응답 파트를 처리. (새 데이터 여부, URL 갱신 필요 여부) 반환"""
+        from pytubefix.sabr.video_streaming.format_initialization_metadata import FormatInitializationMetadata
+        from pytubefix.sabr.video_streaming.media_header import MediaHeader
+        from pytubefix.sabr.video_streaming.next_request_policy import NextRequestPolicy
+        from pytubefix.sabr.video_streaming.sabr_error import SabrError
+        from pytubefix.sabr.video_streaming.sabr_redirect import SabrRedirect
+
+        body = self._request_body()
+        self.requests += 1
+        metrics.inc('ytdl_sabr_requests_total')
+        before = self.video.offset + self.audio.offset
+        reload = False
+        with self.fetch(self.url, body) as response:
+            if self.record_dir:
+                response = _Recorder(response, os.path.join(self.record_dir, f'{self.requests - 1:06d}.ump'))
+            try:
+                for part_type, data in iter_ump_parts(response):
+                    if part_type == PART_MEDIA:
+                        track = self._headers.get(data[0])
+                        if track is not None:
+                            self._put(track, memoryview(data)[1:])
+                    elif part_type == PART_MEDIA_HEADER:
+                        self._media_header(MediaHeader.decode(data))
+                    elif part_type == PART_MEDIA_END:
+                        self._media_end(data[0])
+                    elif part_type == PART_FORMAT_INITIALIZATION_METADATA:
+                        self._format_initialization(FormatInitializationMetadata.decode(data))
+                    elif part_type == PART_NEXT_REQUEST_POLICY:
+                        self._playback_cookie = NextRequestPolicy.decode(data).playbackCookie
+                    elif part_type == PART_SABR_REDIRECT:
+                        self.url = SabrRedirect.decode(data).url or self.url
+                    elif part_type == PART_SABR_ERROR:
+                        error = SabrError.decode(data)
+                        logger.debug("SABR 오류 파트: %s (%s)", error.type, error.code)
+                        reload = True
+                    elif part_type == PART_RELOAD_PLAYER_RESPONSE:
+                        reload = True
+            finally:
+                if self.record_dir:
+                    response.close()
+        # MEDIA_END 없이 응답이 끝난 구간도 끝까지 받았는지 확인
+        for header_id in list(self._headers):
+            self._media_end(header_id)
+        return self.video.offset + self.audio.offset > before, reload
+
+    def _format_initialization(self, metadata):
+        if metadata.formatId is None:
+            return
+        track = self.tracks.get(metadata.formatId['itag'])
+        if track is not None and track.format_id is None:
+            track.format_id = metadata.formatId
+            track.sequence_count = metadata.endSegmentNumber
+
+    def _media_header(self, header):
+        """이어서 쓸 수 있는 구간의 헤더만 트랙에 연결 (중복/순서가 어긋난 구간은 버림)
+
+        헤더의 startRange/contentLength로 구간이 원본 파일의 어디인지 확인합니다.
+        초기화 구간과 첫 미디어 구간 사이(인덱스 구간)만 건너뛸 수 있고, 나머지
+        구간은 앞 구간이 끝난 위치에서 바로 이어져야 합니다.
+        """
+        track = self.tracks.get(header.formatId['itag'] if header.formatId else header.itag)
+        if track is None:
+            return
+        if header.isInitSeg:
+            if track.init_done:
+                return
+        elif not track.init_done or header.sequenceNumber != track.last_sequence + 1:
+            return
+
+        if header.compressionAlgorithm:
+            raise SabrStreamError(f"압축된 미디어 구간은 지원하지 않습니다 "
+                                  f"({track.kind}, compressionAlgorithm={header.compressionAlgorithm})")
+        if not header.contentLength:
+            raise SabrStreamError(f"구간 길이가 없습니다 ({track.kind} {header.sequenceNumber})")
+        skips_index = not header.isInitSeg and track.last_sequence == 0 and header.startRange > track.position
+        if header.startRange != track.position and not skips_index:
+            raise SabrStreamError(f"구간이 이어지지 않습니다 ({track.kind} {header.sequenceNumber}: "
+                                  f"{header.startRange}, 예상 위치 {track.position})")
+
+        if header.isInitSeg:
+            track.init_done = True
+        else:
+            track.last_sequence = header.sequenceNumber
+            track.end_ms = header.startMs + header.durationMs
+        track.position = header.startRange
+        track.segment_end = header.startRange + header.contentLength
+        self._headers[header.headerId] = track
+
+    def _media_end(self, header_id):
+        track = self._headers.pop(header_id, None)
+        if track is not None and track.position != track.segment_end:
+            raise SabrStreamError(f"구간이 중간에 끝났습니다 ({track.kind} {track.position}/{track.segment_end})")
+
+    def _reload(self):
+        """플레이어 응답을 새로 받아 스트리밍 URL과 설정을 갱신"""
+        if self.youtube is None:
+            raise SabrStreamError("스트리밍 URL을 갱신할 수 없습니다.")
+        logger.debug("SABR 스트리밍 URL 갱신")
+        self.youtube.vid_info = None
+        url = self.youtube.server_abr_streaming_url
+        if not url:
+            raise SabrStreamError("스트리밍 URL을 갱신할 수 없습니다.")
+        self.url = url
+        self.ustreamer_config = self.youtube.video_playback_ustreamer_config
+
+
+def _record_dir(video_stream):
+    """SABR_RECORD_DIR이 있으면 세션마다 겹치지 않는 기록 디렉터리 (<영상 ID>-<uuid>)"""
+    base = os.environ.get('SABR_RECORD_DIR')
+    if not base:
+        return None
+    youtube = getattr(video_stream._monostate, 'youtube', None)
+    video_id = getattr(youtube, 'video_id', None) or 'unknown'
+    return os.path.join(base, f'{video_id}-{uuid.uuid4().hex}')
+
+
+def open_streams(video_stream, audio_stream, workers=DEFAULT_WORKERS, mode=None):
+    """병합에 넣을 (비디오 청크, 오디오 청크) 이터레이터 쌍을 반환
+
+    직접 URL이 없는 포맷이 있거나 SABR_MODE=prefer이면 두 트랙을 한 SABR
+    세션에서 받고, 아니면 각각 구간 다운로드로 받습니다.
+    """
+    mode = mode or SABR_MODE
+    required = video_stream.is_sabr or audio_stream.is_sabr
+    if mode != 'off' and (required or mode == 'prefer') and video_stream.video_playback_ustreamer_config:
+        url = streaming_url(video_stream, audio_stream)
+        if url:
+            session = SabrSession(video_stream, audio_stream, url=url, record_dir=_record_dir(video_stream))
+            return session.chunks('video', workers), session.chunks('audio', workers)
+    return iter_ranges(video_stream.url, workers=workers), iter_ranges(audio_stream.url, workers=workers)
+
+
+def replay(directory, output_path, buffer_bytes=DEFAULT_BUFFER_BYTES):
+    """기록된 SABR 응답을 서버 없이 다시 받아 병합 파일로 저장하고 세션을 반환"""
+    with open(os.path.join(directory, 'streams.json')) as f:
+        info = json.load(f)
+    # 직접 URL이 없다고 표시해서 구간 다운로드로 넘어가지 않도록 함
+    video, audio = (types.SimpleNamespace(is_sabr=True, url=None, _monostate=None, **info[kind])
+                    for kind in ('video', 'audio'))
+    session = SabrSession(video, audio, url='replay', fetch=ReplayFetcher(directory),
+                          buffer_bytes=buffer_bytes)
+    merge_to_file(session.chunks('video'), session.chunks('audio'), output_path)
+    return session
+
+
+# 기록된 응답 재생 (`python -m api.sabr <기록 디렉터리> <출력 파일>`)
+if __name__ == '__main__':
+    started, cpu_started = time.perf_counter(), time.process_time()
+    result = replay(sys.argv[1], sys.argv[2])
+    elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+    megabytes = (result.video.offset + result.audio.offset) / 1024 / 1024
+    print(f"{result.requests}개 응답, {megabytes:.1f} MB, {megabytes / elapsed:.1f} MB/s, "
+          f"CPU {cpu / megabytes * 1000:.2f} ms/MB")
@@ -0,0 +1,126 @@
+# api/serving.py
+import os
+import uuid
+
+from flask import Response, request
+from werkzeug.http import http_date, parse_date, parse_range_header, quote_etag, unquote_etag
+from werkzeug.wsgi import wrap_file
+
+
+# file_wrapper를 쓸 수 없는 구간을 보낼 때 한 번에 읽는 크기
+READ_SIZE = 1024 * 1024
+
+
+def _read_range(path, start, end):
+    """start~end(포함) 구간을 큰 블록 단위로 읽음"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            data = f.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def _satisfiable_ranges(header, size):
+    """Range 헤더를 (start, end) 목록으로 변환. 잘못된 헤더면 None"""
+    parsed = parse_range_header(header)
+    if parsed is None or parsed.units != 'bytes':
+        return None
+    ranges = []
+    for start, stop in parsed.ranges:
+        if start < 0:
+            # bytes=-N (마지막 N바이트)
+            start, stop = max(size + start, 0), size
+        stop = size if stop is None else min(stop, size)
+        if start < stop:
+            ranges.append((start, stop - 1))
+    return ranges
+
+
+def _if_range_matches(etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        value, weak = unquote_etag(if_range)
+        return not weak and value == etag
+    date = parse_date(if_range)
+    return date is not None and int(date.timestamp()) == int(last_modified)
+
+
+def send_media_file(path, mimetype='video/mp4', headers=None):
+    """완성된 파일을 Content-Length, Range(단일/다중), ETag와 함께 전송
+
+    파일 끝까지 보내는 경우(전체 또는 bytes=N-)는 wsgi.file_wrapper에 맡겨
+    gunicorn이 sendfile로 커널에서 바로 복사하도록 합니다.
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = f'{stat.st_mtime_ns:x}-{size:x}'
+
+    response_headers = {
+        'Accept-Ranges': 'bytes',
+        'ETag': quote_etag(etag),
+        'Last-Modified': http_date(stat.st_mtime),
+    }
+    response_headers.update(headers or {})
+
+    if etag in request.if_none_match:
+        return Response(status=304, headers=response_headers)
+
+    ranges = None
+    range_header = request.headers.get('Range')
+    if range_header and _if_range_matches(etag, stat.st_mtime):
+        ranges = _satisfiable_ranges(range_header, size)
+        if ranges == []:
+            response_headers['Content-Range'] = f'bytes */{size}'
+            return Response(status=416, headers=response_headers)
+
+    if not ranges:
+        f = open(path, 'rb')
+        response_headers['Content-Length'] = str(size)
+        return Response(wrap_file(request.environ, f), status=200, mimetype=mimetype,
+                        headers=response_headers, direct_passthrough=True)
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        response_headers['Content-Length'] = str(end - start + 1)
+        response_headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+        if end == size - 1:
+            f = open(path, 'rb')
+            f.seek(start)
+            body = wrap_file(request.environ, f)
+        else:
+            body = _read_range(path, start, end)
+        return Response(body, status=206, mimetype=mimetype,
+                        headers=response_headers, direct_passthrough=True)
+
+    # 다중 구간: multipart/byteranges
+    boundary = uuid.uuid4().hex
+    parts = []
+    length = 0
+    for start, end in ranges:
+        part_header = (
+            f'--{boundary}\r\n'
+            f'Content-Type: {mimetype}\r\n'
+            f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n'
+        ).encode('ascii')
+        parts.append((part_header, start, end))
+        length += len(part_header) + (end - start + 1) + 2
+    closing = f'--{boundary}--\r\n'.encode('ascii')
+    length += len(closing)
+
+    def generate():
+        for part_header, start, end in parts:
+            yield part_header
+            yield from _read_range(path, start, end)
+            yield b'\r\n'
+        yield closing
+
+    response_headers['Content-Length'] = str(length)
+    return Response(generate(), status=206, headers=response_headers,
+                    content_type=f'multipart/byteranges; boundary={boundary}',
+                    direct_passthrough=True)
@@ -0,0 +1,72 @@
+# benchmarks/bench_cipher.py
+"""pytubefix Cipher와 CachedCipher의 생성/n 변환 시간 비교
+
+tests/fixtures/player/base.js 앞에 의미 없는 함수를 채워 실제 플레이어
+크기(기본 2 MB)로 만든 뒤 측정합니다.
+
+    python -m benchmarks.bench_cipher [--size-kb 2048] [--calls 200]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from pytubefix.cipher import Cipher
+
+from api.player_cache import PlayerCache
+
+FIXTURE = os.path.join(os.path.dirname(__file__), os.pardir, 'tests', 'fixtures', 'player', 'base.js')
+JS_URL = 'https://www.youtube.com/s/player/fixture/player_ias.vflset/en_US/base.js'
+
+
+def player_js(size):
+    with open(FIXTURE, encoding='utf-8') as f:
+        js = f.read()
+    filler = []
+    total = len(js)
+    i = 0
+    while total < size:
+        line = f'var f{i}=function(a,b){{return a.split("").slice({i % 7}).join("")+b}};\n'
+        filler.append(line)
+        total += len(line)
+        i += 1
+    return ''.join(filler) + js
+
+
+def _timed(function, repeat):
+    started = time.perf_counter()
+    for i in range(repeat):
+        function(i)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-kb', type=int, default=2048)
+    parser.add_argument('--calls', type=int, default=200)
+    args = parser.parse_args()
+
+    js = player_js(args.size_kb * 1024)
+    print(f"player: {len(js) / 1024:.0f} KB")
+
+    with tempfile.TemporaryDirectory() as directory:
+        init = _timed(lambda i: Cipher(js, JS_URL), 5)
+        PlayerCache(directory).cipher(js, JS_URL)
+        # 새 프로세스처럼 메모리 캐시 없이 디스크의 plan만으로 생성
+        cached_init = _timed(lambda i: PlayerCache(directory).cipher(js, JS_URL), 5)
+        print(f"생성        Cipher {init:8.2f} ms   CachedCipher(plan) {cached_init:8.2f} ms")
+
+        plain = Cipher(js, JS_URL)
+        cached = PlayerCache(directory).cipher(js, JS_URL)
+        values = [f'n{i:06d}AbCdEfGhIj' for i in range(args.calls)]
+        assert plain.get_throttling(values[0]) == cached.get_throttling(values[0])
+
+        miss = _timed(lambda i: plain.get_throttling(values[i]), args.calls)
+        cached_miss = _timed(lambda i: cached.get_throttling(values[i][::-1]), args.calls)
+        cached_hit = _timed(lambda i: cached.get_throttling(values[i][::-1]), args.calls)
+        print(f"n 변환      Cipher {miss:8.2f} ms   CachedCipher miss {cached_miss:8.3f} ms"
+              f"   hit {cached_hit:8.4f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/bench_downloader.py
+"""iter_ranges와 pytubefix.request.stream의 처리량/최대 RSS 비교
+
+연결당 속도를 제한한 로컬 서버에서 같은 파일을 받습니다. 최대 RSS가
+섞이지 않도록 방식마다 별도 프로세스에서 실행합니다.
+
+    python -m benchmarks.bench_downloader [--size-mb 64] [--rate-mb 4] [--workers 4]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _peak_rss_mb():
+    # ru_maxrss는 exec 전 부모의 값을 물려받을 수 있어 VmHWM을 읽음
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _consume(mode, url, workers):
+    if mode == 'ranges':
+        from api.downloader import iter_ranges
+        chunks = iter_ranges(url, workers=workers)
+    else:
+        from pytubefix import request
+        # pytubefix는 googlevideo URL에 &range=를 덧붙이므로 쿼리가 있어야 함
+        chunks = request.stream(url + '?source=bench')
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+    return {'mode': mode, 'bytes': size, 'seconds': time.perf_counter() - started,
+            'baseline_rss_mb': baseline, 'peak_rss_mb': _peak_rss_mb()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=64)
+    parser.add_argument('--rate-mb', type=float, default=4, help='연결당 MB/s')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--run', nargs=2, metavar=('MODE', 'URL'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(_consume(*args.run, args.workers)))
+        return
+
+    from tests.http_stub import FileServer
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, 'video.mp4'), 'wb') as f:
+            f.write(os.urandom(args.size_mb * 1024 * 1024))
+        with FileServer(directory, rate=args.rate_mb * 1024 * 1024) as server:
+            for mode in ('pytubefix', 'ranges'):
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_downloader', '--workers', str(args.workers),
+                     '--run', mode, server.url('video.mp4')],
+                    check=True, capture_output=True, text=True).stdout
+                result = json.loads(output)
+                mb = result['bytes'] / 1024 / 1024
+                print(f"{mode:>9}: {mb:.0f} MB in {result['seconds']:.2f}s "
+                      f"({mb / result['seconds']:.1f} MB/s), "
+                      f"peak RSS {result['peak_rss_mb']:.1f} MB "
+                      f"(+{result['peak_rss_mb'] - result['baseline_rss_mb']:.1f} MB while downloading)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# benchmarks/bench_formats.py
+"""결과 페이지 포맷 선택: 기존 filter().order_by() 체인과 FormatTable 비교
+
+tests/fixtures/streaming_data.json(포맷 수백 개)으로 페이지 하나를 만드는
+데 걸리는 시간을 잽니다. 둘 다 표/쿼리를 매번 새로 만듭니다.
+
+    python -m benchmarks.bench_formats [--repeat 2000]
+"""
+import argparse
+import time
+
+from pytubefix.query import StreamQuery
+
+from api.formats import FormatTable
+from tests.test_formats import load_streams, old_rows
+
+
+def _timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    streams = load_streams()
+
+    def old():
+        rows, audio = old_rows(StreamQuery(streams))
+        return rows, list(audio)
+
+    def new():
+        table = FormatTable(streams)
+        return table.best_per_resolution(container='mp4'), table.audio_by_abr()
+
+    print(f"포맷 {len(streams)}개")
+    print(f"filter().order_by() 체인 {_timed(old, args.repeat):.3f} ms/페이지")
+    print(f"FormatTable             {_timed(new, args.repeat):.3f} ms/페이지")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# benchmarks/bench_sabr.py
+"""SABR 세션과 구간 다운로드(iter_ranges)의 병합 처리량/CPU 비교
+
+합성한 비디오/오디오로 SABR 기록을 만들고, 같은 로컬 서버에서 GET(구간)과
+POST(기록된 UMP 응답 재생)로 받아 merge_to_file까지 실행합니다.
+
+    python -m benchmarks.bench_sabr [--seconds 20] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import types
+
+from api.downloader import iter_ranges
+from api.merge import merge_to_file
+from api.sabr import SabrSession
+from tests.fixtures.make_sabr_session import make_media, make_session
+from tests.http_stub import FileServer
+
+
+def _best(function, repeat):
+    results = []
+    for _ in range(repeat):
+        started, cpu_started = time.perf_counter(), time.process_time()
+        function()
+        results.append((time.perf_counter() - started, time.process_time() - cpu_started))
+    return min(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        video, audio = make_media(directory, args.seconds, size='1280x720', video_bitrate='4M',
+                                  audio_bitrate='128k', fps=30)
+        responses = make_session(video, audio, os.path.join(directory, 'session'), segments_per_response=2)
+        with open(os.path.join(directory, 'session', 'streams.json')) as f:
+            info = json.load(f)
+        megabytes = (info['video']['filesize'] + info['audio']['filesize']) / 1024 / 1024
+        output = os.path.join(directory, 'out.mp4')
+
+        with FileServer(directory) as server:
+            def ranged():
+                merge_to_file(iter_ranges(server.url('video.mp4')), iter_ranges(server.url('audio.m4a')), output)
+
+            def sabr():
+                server.posts.clear()
+                streams = [types.SimpleNamespace(is_sabr=True, url=None, _monostate=None, **info[kind])
+                           for kind in ('video', 'audio')]
+                session = SabrSession(*streams, url=server.url('session'))
+                merge_to_file(session.chunks('video'), session.chunks('audio'), output)
+
+            print(f"{megabytes:.1f} MB, SABR 응답 {responses}개")
+            for name, function in (('ranged', ranged), ('sabr', sabr)):
+                elapsed, cpu = _best(function, args.repeat)
+                print(f"{name:>6}: {megabytes / elapsed:6.1f} MB/s, CPU {cpu / megabytes * 1000:5.2f} ms/MB")
+
+
+if __name__ == '__main__':
+    main()
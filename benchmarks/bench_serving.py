@@ -0,0 +1,127 @@
+# benchmarks/bench_serving.py
+"""기존 8 KB 제너레이터와 send_media_file의 GB당 워커 CPU 시간 비교
+
+gunicorn(sync 워커 1개)으로 두 방식을 띄우고 같은 파일을 받으면서,
+워커 프로세스의 utime+stime 증가량을 /proc에서 읽습니다.
+
+    python -m benchmarks.bench_serving [--size-mb 512] [--repeat 3]
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from flask import Flask, Response, stream_with_context
+
+from api.serving import send_media_file
+
+app = Flask(__name__)
+
+
+@app.route('/old')
+def old():
+    # 변경 전 /download의 파일 전송 방식
+    path = os.environ['BENCH_FILE']
+
+    def generate():
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(8192)
+                if not chunk:
+                    break
+                yield chunk
+
+    return Response(stream_with_context(generate()), mimetype='video/mp4')
+
+
+@app.route('/new')
+def new():
+    return send_media_file(os.environ['BENCH_FILE'])
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _cpu_seconds(pid):
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def _worker_pid(master_pid):
+    for _ in range(100):
+        try:
+            with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+                children = f.read().split()
+        except FileNotFoundError:
+            children = []
+        if children:
+            return int(children[0])
+        time.sleep(0.1)
+    raise RuntimeError('gunicorn 워커를 찾지 못했습니다.')
+
+
+def _fetch(port, path):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    conn.request('GET', path)
+    response = conn.getresponse()
+    size = 0
+    while True:
+        data = response.read(1024 * 1024)
+        if not data:
+            break
+        size += len(data)
+    conn.close()
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=512)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(suffix='.mp4') as f:
+        block = os.urandom(1024 * 1024)
+        for _ in range(args.size_mb):
+            f.write(block)
+        f.flush()
+
+        port = _free_port()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--workers', '1', '--bind', f'127.0.0.1:{port}',
+             '--log-level', 'warning', 'benchmarks.bench_serving:app'],
+            env=dict(os.environ, BENCH_FILE=f.name))
+        try:
+            worker = _worker_pid(server.pid)
+            for _ in range(50):
+                try:
+                    _fetch(port, '/new')
+                    break
+                except OSError:
+                    time.sleep(0.1)
+
+            for path in ('/old', '/new'):
+                cpu = wall = 0.0
+                for _ in range(args.repeat):
+                    before, started = _cpu_seconds(worker), time.perf_counter()
+                    size = _fetch(port, path)
+                    wall += time.perf_counter() - started
+                    cpu += _cpu_seconds(worker) - before
+                gb = size * args.repeat / 1024 ** 3
+                print(f"{path}: 워커 CPU {cpu / gb * 1000:7.0f} ms/GB, "
+                      f"{size * args.repeat / wall / 1024 ** 2:7.0f} MB/s")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+# benchmarks/bench_startup.py
+"""gunicorn 시작 비용 비교: import 시간, 워커별 RSS/PSS, 첫 요청 지연
+
+영상 정보와 플레이어 캐시를 미리 채워 네트워크 없이 실행합니다. 모드:
+- app:     `api.index:app` (준비 작업 없음)
+- lazy:    `api.index:create_app()` + WARM_UP=0 (pytubefix를 첫 요청 때 불러옴)
+- preload: `--preload api.index:create_app()` (마스터에서 한 번 준비 후 포크)
+
+--root로 다른 체크아웃(예: `git worktree add /tmp/before <커밋>`)을 지정하면
+변경 전 코드도 같은 방식으로 잴 수 있습니다. 그 트리에 없는 모드는 건너뜁니다.
+
+    python -m benchmarks.bench_startup [--root .] [--runs 5] [--workers 2]
+"""
+import argparse
+import json
+import os
+import re
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+
+from api.cache import SQLiteBackend
+from api.player_cache import PlayerCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLAYER_FIXTURE = os.path.join(ROOT, 'tests', 'fixtures', 'player', 'base.js')
+VIDEO_ID = 'aqz-KE-bpKQ'
+JS_URL = 'https://www.youtube.com/s/player/fixture/player_ias.vflset/en_US/base.js'
+MODES = {
+    'app': ([], 'api.index:app', {}),
+    'lazy': ([], 'api.index:create_app()', {'WARM_UP': '0'}),
+    'preload': (['--preload'], 'api.index:create_app()', {}),
+}
+
+
+def _format(itag, mime_type, **extra):
+    expire = int(time.time()) + 20000
+    return dict({'itag': itag, 'url': f'http://127.0.0.1:1/videoplayback?itag={itag}&expire={expire}',
+                 'mimeType': mime_type, 'bitrate': 1000000, 'averageBitrate': 900000,
+                 'contentLength': '1000000', 'approxDurationMs': '60000', 'lastModified': '1'}, **extra)
+
+
+def seed(directory):
+    """캐시에 영상 하나와 플레이어 하나를 넣어두고 환경 변수를 반환"""
+    vid_info = {
+        'playabilityStatus': {'status': 'OK'},
+        'videoDetails': {'videoId': VIDEO_ID, 'title': 'Bench video', 'lengthSeconds': '60', 'author': 'bench',
+                         'shortDescription': '', 'viewCount': '1', 'keywords': [],
+                         'thumbnail': {'thumbnails': [{'url': 'http://127.0.0.1:1/thumb.jpg'}]}},
+        'streamingData': {
+            'expiresInSeconds': '21540',
+            'formats': [_format(18, 'video/mp4; codecs="avc1.42001E, mp4a.40.2"', width=640, height=360, fps=30)],
+            'adaptiveFormats': [
+                _format(137, 'video/mp4; codecs="avc1.640028"', width=1920, height=1080, fps=30),
+                _format(136, 'video/mp4; codecs="avc1.4d401f"', width=1280, height=720, fps=30),
+                _format(140, 'audio/mp4; codecs="mp4a.40.2"'),
+            ],
+        },
+        'playerConfig': {'mediaCommonConfig': {'mediaUstreamerRequestConfig': {
+            'videoPlaybackUstreamerConfig': 'AAAA'}}},
+    }
+    for fmt in vid_info['streamingData']['formats'] + vid_info['streamingData']['adaptiveFormats']:
+        fmt['is_otf'] = False
+    metadata_path = os.path.join(directory, 'metadata.sqlite3')
+    SQLiteBackend(metadata_path).set(
+        f'WEB:{VIDEO_ID}', json.dumps({'client': 'WEB', 'po_token': None, 'vid_info': vid_info}),
+        time.time() + 3600)
+
+    player_dir = os.path.join(directory, 'player')
+    with open(PLAYER_FIXTURE, encoding='utf-8') as f:
+        js = f.read()
+    players = PlayerCache(player_dir)
+    players._write(players._path(JS_URL, '.js'), js)
+    players.cipher(js, JS_URL)
+    return {'METADATA_CACHE_PATH': metadata_path, 'PLAYER_CACHE_DIR': player_dir,
+            'JOB_OUTPUT_DIR': os.path.join(directory, 'output'), 'LOG_LEVEL': 'WARNING'}
+
+
+def import_time(root, env):
+    """`import api.index`의 누적 import 시간(ms)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import api.index'],
+                            cwd=root, env=env, capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|\s*api\.index$', line)
+        if match:
+            return int(match.group(1)) / 1000
+    raise RuntimeError('api.index import 시간을 찾지 못했습니다.')
+
+
+def _memory(pid):
+    with open(f'/proc/{pid}/status') as f:
+        rss = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        pss = next(int(line.split()[1]) for line in f if line.startswith('Pss:'))
+    return rss / 1024, pss / 1024
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def run_server(root, env, mode, workers):
+    """gunicorn을 한 번 띄워 재고 결과 dict를 반환 (모드를 지원하지 않으면 None)"""
+    options, target, extra_env = MODES[mode]
+    port = _free_port()
+    base = f'http://127.0.0.1:{port}'
+
+    def request(path, data=None):
+        started = time.perf_counter()
+        body = urllib.parse.urlencode(data).encode() if data else None
+        with urllib.request.urlopen(base + path, data=body, timeout=30) as response:
+            response.read()
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', '8',
+         '--bind', f'127.0.0.1:{port}', *options, target],
+        cwd=root, env=dict(env, **extra_env), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if server.poll() is not None:
+                return None
+            try:
+                # pytubefix를 건드리지 않는 가벼운 경로로 준비 여부만 확인
+                request('/cache_stats')
+                break
+            except OSError:
+                time.sleep(0.01)
+        result = {'boot': (time.perf_counter() - started) * 1000}
+        result['first /'] = request('/')
+        form = {'url': f'https://www.youtube.com/watch?v={VIDEO_ID}'}
+        result['first /get_streams'] = request('/get_streams', form)
+        result['second /get_streams'] = request('/get_streams', form)
+        with open(f'/proc/{server.pid}/task/{server.pid}/children') as f:
+            memory = [_memory(int(pid)) for pid in f.read().split()]
+        result['worker RSS'] = statistics.median(rss for rss, _ in memory)
+        result['worker PSS'] = statistics.median(pss for _, pss in memory)
+        return result
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--root', default=ROOT)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--modes', default='app,lazy,preload')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1', **seed(directory))
+        times = [import_time(args.root, env) for _ in range(args.runs)]
+        print(f"import api.index: {statistics.median(times):.1f} ms")
+        for mode in args.modes.split(','):
+            runs = [run_server(args.root, env, mode, args.workers) for _ in range(args.runs)]
+            if None in runs:
+                print(f"{mode}: 이 트리에서 실행할 수 없음")
+                continue
+            summary = ', '.join(f"{key} {statistics.median(r[key] for r in runs):.1f}"
+                                f"{' MB' if key.startswith('worker') else ' ms'}" for key in runs[0])
+            print(f"{mode}: {summary}")
+
+
+if __name__ == '__main__':
+    main()
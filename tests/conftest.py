@@ -0,0 +1,30 @@
+# tests/conftest.py
+import shutil
+import subprocess
+
+import pytest
+
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='ffmpeg가 필요합니다.')
+
+
+def make_media(directory, seconds=6, size='320x240', video_bitrate='1M'):
+    """ffmpeg로 합성한 비디오(video.mp4)/오디오(audio.m4a) 파일을 만들고 경로를 반환"""
+    video = directory / 'video.mp4'
+    audio = directory / 'audio.m4a'
+    # googlevideo의 DASH 파일처럼 moov가 앞에 있는 fragmented MP4로 만듦
+    common = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y']
+    fragmented = ['-movflags', 'frag_keyframe+empty_moov']
+    subprocess.run(common + ['-f', 'lavfi', '-i', f'testsrc=size={size}:rate=25', '-t', str(seconds),
+                             '-c:v', 'libx264', '-preset', 'ultrafast', '-b:v', video_bitrate, '-g', '25',
+                             *fragmented, str(video)], check=True)
+    subprocess.run(common + ['-f', 'lavfi', '-i', 'sine=frequency=440', '-t', str(seconds),
+                             '-c:a', 'aac', '-b:a', '128k', *fragmented, str(audio)], check=True)
+    return video, audio
+
+
+@pytest.fixture(scope='session')
+def media(tmp_path_factory):
+    if shutil.which('ffmpeg') is None:
+        pytest.skip('ffmpeg가 필요합니다.')
+    return make_media(tmp_path_factory.mktemp('media'))
@@ -0,0 +1,141 @@
+# tests/fixtures/make_sabr_session.py
+"""googlevideo식 DASH 파일과 그 파일의 SABR 세션 기록(streams.json, 000000.ump, ...)을 만듦
+
+기록은 SabrSession(record_dir=...)이 저장하는 것과 같은 형식입니다. 실제 서버처럼
+초기화 구간은 ftyp+moov(initRange)만이고 그 뒤의 sidx(indexRange)는 보내지 않으며,
+미디어 구간은 moof+mdat 조각 하나씩입니다. MediaHeader에는 원본 파일 안의 실제
+startRange/contentLength를 적습니다. 응답마다 segments_per_response개 구간을 두 트랙
+모두 담고, duplicate이면 직전 응답의 마지막 구간을 한 번 더 보내 중복 제거도 거치게 합니다.
+
+    python -m tests.fixtures.make_sabr_session <출력 디렉터리>
+    (video.mp4, audio.m4a와 session/ 기록을 만듦. tests/fixtures/sabr가 이 결과)
+"""
+import json
+import os
+import struct
+import subprocess
+import sys
+
+from pytubefix.sabr.common import InitRange
+from pytubefix.sabr.video_streaming.format_initialization_metadata import FormatInitializationMetadata
+from pytubefix.sabr.video_streaming.media_header import MediaHeader
+
+from api.sabr import PART_FORMAT_INITIALIZATION_METADATA, PART_MEDIA, PART_MEDIA_END, PART_MEDIA_HEADER
+
+VIDEO_ITAG = 136
+AUDIO_ITAG = 140
+MEDIA_PART_SIZE = 32 * 1024
+# googlevideo의 DASH 파일처럼 ftyp, moov, sidx 뒤에 moof+mdat 조각이 이어지는 파일
+DASH_MOVFLAGS = 'frag_keyframe+empty_moov+default_base_moof+global_sidx+skip_trailer'
+
+
+def make_media(directory, seconds=6, size='320x240', video_bitrate='100k', audio_bitrate='32k', fps=25):
+    """1초 간격 조각으로 된 비디오(video.mp4)/오디오(audio.m4a)를 만들고 경로를 반환"""
+    video = os.path.join(directory, 'video.mp4')
+    audio = os.path.join(directory, 'audio.m4a')
+    common = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y']
+    subprocess.run(common + ['-f', 'lavfi', '-i', f'testsrc=size={size}:rate={fps}', '-t', str(seconds),
+                             '-c:v', 'libx264', '-preset', 'ultrafast', '-b:v', video_bitrate, '-g', str(fps),
+                             '-movflags', DASH_MOVFLAGS, video], check=True)
+    subprocess.run(common + ['-f', 'lavfi', '-i', 'sine=frequency=440', '-t', str(seconds),
+                             '-c:a', 'aac', '-b:a', audio_bitrate, '-frag_duration', '1000000',
+                             '-movflags', DASH_MOVFLAGS, audio], check=True)
+    return video, audio
+
+
+def split_segments(data):
+    """최상위 박스를 읽어 (초기화 구간, 인덱스 구간, 미디어 구간 목록)을 (시작, 끝+1)로 반환"""
+    boxes = []
+    position = 0
+    while position < len(data):
+        size, box_type = struct.unpack('>I4s', data[position:position + 8])
+        boxes.append((box_type, position, position + size))
+        position += size
+    moov_end = next(end for box_type, _, end in boxes if box_type == b'moov')
+    index = [(start, end) for box_type, start, end in boxes if box_type == b'sidx']
+    moofs = [start for box_type, start, _ in boxes if box_type == b'moof']
+    segments = [(start, end) for start, end in zip(moofs, moofs[1:] + [len(data)])]
+    return (0, moov_end), (index[0][0], index[-1][1]) if index else None, segments
+
+
+def _varint(value):
+    if value < 1 << 7:
+        return bytes([value])
+    if value < 1 << 14:
+        return bytes([0x80 | (value & 0x3F), value >> 6])
+    if value < 1 << 21:
+        return bytes([0xC0 | (value & 0x1F), (value >> 5) & 0xFF, value >> 13])
+    if value < 1 << 28:
+        return bytes([0xE0 | (value & 0x0F), (value >> 4) & 0xFF, (value >> 12) & 0xFF, value >> 20])
+    return b'\xf0' + value.to_bytes(4, 'little')
+
+
+def ump_part(part_type, data):
+    return _varint(part_type) + _varint(len(data)) + data
+
+
+def make_session(video_path, audio_path, directory, segments_per_response=2, duplicate=True):
+    """기록을 만들고 응답 수를 반환"""
+    os.makedirs(directory, exist_ok=True)
+    tracks = {}
+    info = {}
+    for kind, itag, path in (('video', VIDEO_ITAG, video_path), ('audio', AUDIO_ITAG, audio_path)):
+        with open(path, 'rb') as f:
+            data = f.read()
+        init, index, segments = split_segments(data)
+        # 0번은 초기화 구간, 1번부터 미디어 구간
+        tracks[itag] = (data, init, index, [init] + segments)
+        info[kind] = {'itag': itag, 'resolution': '720p' if kind == 'video' else None, 'is_drc': False,
+                      'last_Modified': '1', 'xtags': None, 'filesize': len(data),
+                      'video_playback_ustreamer_config': 'AAAA', 'po_token': None}
+    with open(os.path.join(directory, 'streams.json'), 'w') as f:
+        json.dump(info, f)
+
+    count = max(len(track[3]) for track in tracks.values())
+    responses = 0
+    header_id = 0
+    for first in range(0, count, segments_per_response):
+        body = b''
+        if first == 0:
+            for itag, (_, init, index, segments) in tracks.items():
+                metadata = FormatInitializationMetadata()
+                metadata.formatId = {'itag': itag, 'lastModified': 1}
+                metadata.endSegmentNumber = len(segments) - 1
+                metadata.initRange = InitRange(init[0], init[1] - 1)
+                metadata.indexRange = {'start': index[0], 'end': index[1] - 1} if index else None
+                body += ump_part(PART_FORMAT_INITIALIZATION_METADATA,
+                              bytes(FormatInitializationMetadata.encode(metadata).finish()))
+        start = max(first - 1, 0) if duplicate else first
+        for sequence in range(start, min(first + segments_per_response, count)):
+            for itag, (data, _, _, segments) in tracks.items():
+                if sequence >= len(segments):
+                    continue
+                segment_start, segment_end = segments[sequence]
+                header_id = (header_id + 1) % 128
+                header = {'headerId': header_id, 'itag': itag, 'formatId': {'itag': itag, 'lastModified': 1},
+                          'isInitSeg': sequence == 0, 'sequenceNumber': sequence,
+                          'startRange': segment_start, 'contentLength': segment_end - segment_start,
+                          'startMs': max(sequence - 1, 0) * 1000, 'durationMs': 1000 if sequence else 0}
+                body += ump_part(PART_MEDIA_HEADER, bytes(MediaHeader.encode(header).finish()))
+                for i in range(segment_start, segment_end, MEDIA_PART_SIZE):
+                    body += ump_part(PART_MEDIA, bytes([header_id]) + data[i:min(i + MEDIA_PART_SIZE, segment_end)])
+                body += ump_part(PART_MEDIA_END, bytes([header_id]))
+        with open(os.path.join(directory, f'{responses:06d}.ump'), 'wb') as f:
+            f.write(body)
+        responses += 1
+    return responses
+
+
+def sabr_bytes(path):
+    """SABR로 받는 바이트 = 원본 파일에서 인덱스(sidx) 구간을 뺀 것"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    _, index, _ = split_segments(data)
+    return data[:index[0]] + data[index[1]:] if index else data
+
+
+if __name__ == '__main__':
+    output = sys.argv[1]
+    os.makedirs(output, exist_ok=True)
+    video, audio = make_media(output)
+    print(f"{make_session(video, audio, os.path.join(output, 'session'))}개 응답")
@@ -0,0 +1,93 @@
+# tests/fixtures/make_streaming_data.py
+"""다국어 오디오 트랙이 많은 영상처럼 포맷 수백 개짜리 streamingData를 생성
+
+    python tests/fixtures/make_streaming_data.py > tests/fixtures/streaming_data.json
+"""
+import json
+import random
+
+DURATION_MS = 600000
+LANGUAGES = ['en', 'ko', 'ja', 'zh-Hans', 'zh-Hant', 'es', 'es-419', 'fr', 'de', 'it', 'pt', 'pt-BR',
+             'ru', 'uk', 'pl', 'nl', 'sv', 'tr', 'ar', 'he', 'hi', 'id', 'th', 'vi', 'ms', 'fil',
+             'cs', 'hu', 'ro', 'el']
+
+# (itag, mimeType, 높이, fps)
+VIDEO = [
+    (160, 'video/mp4; codecs="avc1.4d400c"', 144, 30), (133, 'video/mp4; codecs="avc1.4d4015"', 240, 30),
+    (134, 'video/mp4; codecs="avc1.4d401e"', 360, 30), (135, 'video/mp4; codecs="avc1.4d401f"', 480, 30),
+    (136, 'video/mp4; codecs="avc1.4d401f"', 720, 30), (298, 'video/mp4; codecs="avc1.4d4020"', 720, 60),
+    (137, 'video/mp4; codecs="avc1.640028"', 1080, 30), (299, 'video/mp4; codecs="avc1.64002a"', 1080, 60),
+    (264, 'video/mp4; codecs="avc1.640032"', 1440, 30), (266, 'video/mp4; codecs="avc1.640033"', 2160, 30),
+    (394, 'video/mp4; codecs="av01.0.00M.08"', 144, 30), (395, 'video/mp4; codecs="av01.0.00M.08"', 240, 30),
+    (396, 'video/mp4; codecs="av01.0.01M.08"', 360, 30), (397, 'video/mp4; codecs="av01.0.04M.08"', 480, 30),
+    (398, 'video/mp4; codecs="av01.0.08M.08"', 720, 60), (399, 'video/mp4; codecs="av01.0.09M.08"', 1080, 60),
+    (400, 'video/mp4; codecs="av01.0.12M.08"', 1440, 60), (401, 'video/mp4; codecs="av01.0.13M.08"', 2160, 60),
+    (278, 'video/webm; codecs="vp9"', 144, 30), (242, 'video/webm; codecs="vp9"', 240, 30),
+    (243, 'video/webm; codecs="vp9"', 360, 30), (244, 'video/webm; codecs="vp9"', 480, 30),
+    (247, 'video/webm; codecs="vp9"', 720, 30), (248, 'video/webm; codecs="vp9"', 1080, 30),
+    (271, 'video/webm; codecs="vp9"', 1440, 30), (313, 'video/webm; codecs="vp9"', 2160, 30),
+    (302, 'video/webm; codecs="vp9"', 720, 60), (303, 'video/webm; codecs="vp9"', 1080, 60),
+    (308, 'video/webm; codecs="vp9"', 1440, 60), (315, 'video/webm; codecs="vp9"', 2160, 60),
+    (330, 'video/webm; codecs="vp09.02.10.10.01.09.16.09.01"', 144, 60),
+    (331, 'video/webm; codecs="vp09.02.10.10.01.09.16.09.01"', 240, 60),
+    (332, 'video/webm; codecs="vp09.02.10.10.01.09.16.09.01"', 360, 60),
+    (333, 'video/webm; codecs="vp09.02.10.10.01.09.16.09.01"', 480, 60),
+    (334, 'video/webm; codecs="vp09.02.10.10.01.09.16.09.01"', 720, 60),
+    (335, 'video/webm; codecs="vp09.02.10.10.01.09.16.09.01"', 1080, 60),
+    (336, 'video/webm; codecs="vp09.02.10.10.01.09.16.09.01"', 1440, 60),
+    (337, 'video/webm; codecs="vp09.02.10.10.01.09.16.09.01"', 2160, 60),
+]
+# (itag, mimeType, 비트레이트)
+AUDIO = [
+    (139, 'audio/mp4; codecs="mp4a.40.5"', 48000), (140, 'audio/mp4; codecs="mp4a.40.2"', 130000),
+    (249, 'audio/webm; codecs="opus"', 55000), (250, 'audio/webm; codecs="opus"', 72000),
+    (251, 'audio/webm; codecs="opus"', 140000),
+]
+
+
+def _common(rng, itag, mime_type, bitrate):
+    return {
+        'itag': itag,
+        'url': f'https://rr1---sn-fixture.googlevideo.com/videoplayback?itag={itag}&id={rng.getrandbits(32):08x}',
+        'mimeType': mime_type,
+        'bitrate': bitrate,
+        'averageBitrate': int(bitrate * 0.8),
+        'contentLength': str(int(bitrate * 0.8 / 8 * DURATION_MS / 1000)),
+        'approxDurationMs': str(DURATION_MS),
+        'lastModified': str(1700000000000000 + rng.randrange(10 ** 9)),
+        'projectionType': 'RECTANGULAR',
+    }
+
+
+def streaming_data(seed=0):
+    rng = random.Random(seed)
+    formats = [dict(_common(rng, 18, 'video/mp4; codecs="avc1.42001E, mp4a.40.2"', 500000),
+                    width=640, height=360, fps=30, quality='medium', qualityLabel='360p',
+                    audioQuality='AUDIO_QUALITY_LOW', audioSampleRate='44100', audioChannels=2)]
+
+    adaptive = []
+    for itag, mime_type, height, fps in VIDEO:
+        bitrate = int(height * height * fps * rng.uniform(0.05, 0.09))
+        label = f'{height}p{fps if fps > 30 else ""}'
+        adaptive.append(dict(_common(rng, itag, mime_type, bitrate), width=height * 16 // 9, height=height,
+                             fps=fps, quality=f'hd{height}' if height >= 720 else 'medium',
+                             qualityLabel=label))
+
+    for i, language in enumerate(LANGUAGES):
+        track = {'displayName': f'{language} original' if i == 0 else language,
+                 'id': f'{language}.{4 if i == 0 else 3}', 'audioIsDefault': i == 0}
+        for drc in (False, True):
+            for itag, mime_type, bitrate in AUDIO:
+                item = dict(_common(rng, itag, mime_type, bitrate), audioQuality='AUDIO_QUALITY_MEDIUM',
+                            audioSampleRate='48000' if 'opus' in mime_type else '44100',
+                            audioChannels=2, audioTrack=track, xtags=f'lang={language}')
+                if drc:
+                    item['isDrc'] = True
+                    item['xtags'] += ':drc=1'
+                adaptive.append(item)
+
+    return {'expiresInSeconds': '21540', 'formats': formats, 'adaptiveFormats': adaptive}
+
+
+if __name__ == '__main__':
+    print(json.dumps(streaming_data(), indent=1))
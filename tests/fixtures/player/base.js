@@ -0,0 +1,8 @@
+var Xy={rv:function(a,b){a.splice(0,b)},
+Jt:function(a){a.reverse()},
+Kw:function(a,b){var c=a[0];a[0]=a[b%a.length];a[b%a.length]=c}};
+Uy=function(a){a=a.split("");Xy.Jt(a,8);Xy.Kw(a,35);Xy.rv(a,3);Xy.Kw(a,12);Xy.Jt(a,71);return a.join("")};
+var Bp=function(a){var b=a.split(""),c=[1045,"q",function(d){d.reverse()},function(d,e){d.push(e)},function(d,e){e=(e%d.length+d.length)%d.length;d.splice(0,1,d.splice(e,1,d[0])[0])},function(d,e){e=(e%d.length+d.length)%d.length;d.splice(-e).reverse().forEach(function(f){d.unshift(f)})},-7];try{c[2](b);c[4](b,c[0]);c[5](b,c[6]);c[3](b,c[1]);c[4](b,17)}catch(f){return"enhanced_except_"+a}return b.join("")};
+var Hq=[Bp];
+var Zl=function(a){var b;(b=a.get("n"))&&(b=Hq[0](b),a.set("n",b));return a};
+g.Qz=function(a,b){var c=a.s;c&&(c=Uy(decodeURIComponent(c)));b.set("sig",encodeURIComponent(c))};
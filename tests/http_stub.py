@@ -0,0 +1,164 @@
+# tests/http_stub.py
+# 테스트/벤치마크용 로컬 googlevideo 대역 HTTP 서버
+import http.server
+import os
+import re
+import threading
+import time
+import urllib.parse
+
+_RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+
+# 제한 속도에서 한 번에 보내는 크기
+SEND_SIZE = 16 * 1024
+# 'stall' 실패에서 응답을 멈추는 시간(초)
+STALL_SECONDS = 1
+
+
+class FileServer:
+    """directory의 파일을 서비스하는 스레드 HTTP/1.1 서버
+
+    Range 헤더와 googlevideo식 range= 쿼리를 모두 지원합니다. rate는 연결
+    하나의 초당 전송 바이트(None이면 제한 없음)이고, finished에는 파일을
+    끝까지 보낸 시각이 기록됩니다. fail()로 다음 요청들의 실패를 지정할 수
+    있습니다.
+    """
+
+    def __init__(self, directory, rate=None):
+        self.directory = directory
+        self.rate = rate
+        self.finished = {}
+        self.requests = []
+        self.posts = {}
+        self.failures = {}
+        self._lock = threading.Lock()
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def url(self, name):
+        return f'{self.base_url}/{name}'
+
+    def fail(self, name, *failures):
+        """name의 다음 GET 요청들을 차례로 실패시킴
+
+        failures의 각 값은 상태 코드(429면 Retry-After: 0을 함께 보냄), 본문
+        절반만 보낸 뒤 STALL_SECONDS 동안 멈췄다가 연결을 끊는 'stall', 또는
+        정상 응답인 None입니다.
+        """
+        with self._lock:
+            self.failures.setdefault(name, []).extend(failures)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _send(self, wfile, data):
+        if not self.rate:
+            wfile.write(data)
+            return
+        started = time.monotonic()
+        for i in range(0, len(data), SEND_SIZE):
+            # 보낸 바이트가 속도 한도를 넘지 않도록 쓰기 전에 기다림
+            delay = started + i / self.rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            wfile.write(data[i:i + SEND_SIZE])
+
+    def _handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                parts = urllib.parse.urlsplit(self.path)
+                name = parts.path.lstrip('/')
+                path = os.path.join(server.directory, name)
+                if not os.path.isfile(path):
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                with open(path, 'rb') as f:
+                    data = f.read()
+                size = len(data)
+
+                query_range = urllib.parse.parse_qs(parts.query).get('range')
+                match = _RANGE_RE.match(self.headers.get('Range', ''))
+                if query_range:
+                    start, _, end = query_range[0].partition('-')
+                    start, end = int(start), min(int(end), size - 1)
+                    status = 200
+                elif match:
+                    start = int(match.group(1) or 0)
+                    end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+                    status = 206
+                else:
+                    start, end, status = 0, size - 1, 200
+                with server._lock:
+                    server.requests.append((name, start, end))
+                    failures = server.failures.get(name)
+                    failure = failures.pop(0) if failures else None
+                if isinstance(failure, int):
+                    self.send_response(failure)
+                    if failure == 429:
+                        self.send_header('Retry-After', '0')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                self.send_response(status)
+                if status == 206:
+                    self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+                self.send_header('Content-Length', str(max(end - start + 1, 0)))
+                self.send_header('Content-Type', 'video/mp4')
+                self.end_headers()
+                body = data[start:end + 1]
+                if failure == 'stall':
+                    body = body[:len(body) // 2]
+                    self.close_connection = True
+                try:
+                    server._send(self.wfile, body)
+                    self.wfile.flush()
+                    if failure == 'stall':
+                        time.sleep(STALL_SECONDS)
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+                if end == size - 1 and failure is None:
+                    with server._lock:
+                        server.finished[name] = time.monotonic()
+
+            def do_POST(self):
+                # SABR 대역: 경로별로 기록된 응답(<경로>/000000.ump, ...)을 순서대로 돌려줌
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                name = urllib.parse.urlsplit(self.path).path.lstrip('/')
+                with server._lock:
+                    index = server.posts.get(name, 0)
+                    server.posts[name] = index + 1
+                path = os.path.join(server.directory, name, f'{index:06d}.ump')
+                if not os.path.isfile(path):
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                with open(path, 'rb') as f:
+                    data = f.read()
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(data)))
+                self.send_header('Content-Type', 'application/vnd.yt-ump')
+                self.end_headers()
+                server._send(self.wfile, data)
+
+        return Handler
@@ -0,0 +1,174 @@
+# tests/test_batch.py
+import io
+import os
+import threading
+import time
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+from api import batch
+from api.batch import BatchDownloader, HostRateLimiter
+from api.downloader import DownloadError, iter_ranges
+from api.jobs import JobManager, JobQueueFull, OutputStore, output_key
+from tests.http_stub import FileServer
+
+
+def _stream(server, itag, resolution=None, abr=None, progressive=False):
+    kind = 'audio' if abr else 'video'
+    return SimpleNamespace(
+        itag=itag, resolution=resolution, abr=abr, fps=30 if resolution else None, bitrate=1000,
+        subtype='mp4', type=kind, is_progressive=progressive,
+        video_codec='avc1.4d401f' if resolution else None,
+        audio_codec='mp4a.40.2' if abr or progressive else None,
+        url=server.url(f'{itag}.mp4'), filesize=0,
+    )
+
+
+def _video(server, video_id, title, progressive=False):
+    if progressive:
+        streams = [_stream(server, 18, '360p', progressive=True)]
+    else:
+        streams = [_stream(server, 136, '720p'), _stream(server, 140, abr='128kbps')]
+    return SimpleNamespace(video_id=video_id, title=title, length=10, fmt_streams=streams)
+
+
+@pytest.fixture
+def server(tmp_path):
+    directory = tmp_path / 'googlevideo'
+    directory.mkdir()
+    (directory / '18.mp4').write_bytes(os.urandom(300 * 1024))
+    with FileServer(str(directory)) as server:
+        yield server
+
+
+def _downloader(videos, job_manager, **kwargs):
+    def resolve(url):
+        video = videos[url]
+        if isinstance(video, Exception):
+            raise video
+        return video
+
+    return BatchDownloader(
+        resolve=resolve,
+        job_manager=job_manager,
+        filename_for=lambda yt, stream: f'{yt.title}_{stream.resolution}.mp4',
+        rate_limiter=HostRateLimiter(interval=0),
+        **kwargs
+    )
+
+
+def test_zip_contains_merged_progressive_and_error_entries(tmp_path, server):
+    store = OutputStore(str(tmp_path / 'output'))
+    job_manager = JobManager(store)
+    merged = {}
+    for video_id in ('a', 'b'):
+        # 이미 병합된 결과가 있으므로 JobManager는 ffmpeg 없이 완료된 작업을 돌려줌
+        merged[video_id] = os.urandom(200 * 1024)
+        with open(store.path(output_key(video_id, 136, 140) + '.mp4'), 'wb') as f:
+            f.write(merged[video_id])
+    videos = {
+        'https://www.youtube.com/watch?v=a': _video(server, 'a', 'Same'),
+        'https://www.youtube.com/watch?v=b': _video(server, 'b', 'Same'),
+        'https://www.youtube.com/watch?v=c': _video(server, 'c', 'Clip', progressive=True),
+        'https://www.youtube.com/watch?v=d': ValueError('비공개 영상'),
+    }
+
+    data = b''.join(_downloader(videos, job_manager).generate(
+        list(videos), lambda url: iter_ranges(url, segment_size=64 * 1024)))
+
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    assert archive.testzip() is None
+    assert archive.namelist() == ['Same_720p.mp4', 'Same_720p (2).mp4', 'Clip_360p.mp4', '004.error.txt']
+    assert all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist())
+    assert archive.read('Same_720p.mp4') == merged['a']
+    assert archive.read('Same_720p (2).mp4') == merged['b']
+    with open(os.path.join(server.directory, '18.mp4'), 'rb') as f:
+        assert archive.read('Clip_360p.mp4') == f.read()
+    error = archive.read('004.error.txt').decode()
+    assert error.startswith('https://www.youtube.com/watch?v=d\n') and '비공개 영상' in error
+
+
+def test_progressive_failures_become_error_entries(tmp_path, server):
+    videos = {}
+    for video_id, title in (('a', 'Expired'), ('b', 'Dropped'), ('c', 'Clip')):
+        video = _video(server, video_id, title, progressive=True)
+        video.fmt_streams[0].url += f'?id={video_id}'
+        videos[f'https://www.youtube.com/watch?v={video_id}'] = video
+
+    def progressive_chunks(url):
+        if url.endswith('id=a'):
+            raise DownloadError('HTTP 403')
+        chunks = iter_ranges(url, segment_size=64 * 1024)
+        if url.endswith('id=b'):
+            # 첫 구간을 보낸 뒤 연결이 끊김
+            yield next(chunks)
+            chunks.close()
+            raise DownloadError('구간 다운로드 실패')
+        yield from chunks
+
+    downloader = _downloader(videos, JobManager(OutputStore(str(tmp_path / 'output'))))
+    data = b''.join(downloader.generate(list(videos), progressive_chunks))
+
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    assert archive.testzip() is None
+    # 첫 청크 전에 실패하면 오류 항목만, 도중에 실패하면 받은 데까지의 항목 뒤에 오류 항목
+    assert archive.namelist() == ['001.error.txt', 'Dropped_360p.mp4', '002.error.txt', 'Clip_360p.mp4']
+    assert 'HTTP 403' in archive.read('001.error.txt').decode()
+    assert '구간 다운로드 실패' in archive.read('002.error.txt').decode()
+    with open(os.path.join(server.directory, '18.mp4'), 'rb') as f:
+        expected = f.read()
+    assert archive.read('Dropped_360p.mp4') == expected[:64 * 1024]
+    assert archive.read('Clip_360p.mp4') == expected
+
+
+class _FullQueue:
+    def __init__(self):
+        self.calls = 0
+
+    def submit(self, *args):
+        self.calls += 1
+        raise JobQueueFull()
+
+
+def test_queue_full_retries_are_bounded(server, monkeypatch):
+    monkeypatch.setattr(batch, 'QUEUE_RETRY_DELAY', 0.01)
+    monkeypatch.setattr(batch, 'MAX_QUEUE_RETRIES', 3)
+    job_manager = _FullQueue()
+    videos = {'https://www.youtube.com/watch?v=a': _video(server, 'a', 'Busy')}
+
+    data = b''.join(_downloader(videos, job_manager).generate(list(videos), iter_ranges))
+
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    assert archive.namelist() == ['001.error.txt']
+    assert job_manager.calls == 3
+
+
+def test_closing_the_response_stops_pending_items(server, monkeypatch):
+    monkeypatch.setattr(batch, 'QUEUE_RETRY_DELAY', 0.01)
+    monkeypatch.setattr(batch, 'MAX_QUEUE_RETRIES', 100000)
+    job_manager = _FullQueue()
+    videos = {
+        'https://www.youtube.com/watch?v=c': _video(server, 'c', 'Clip', progressive=True),
+        'https://www.youtube.com/watch?v=a': _video(server, 'a', 'Busy'),
+    }
+
+    chunks = _downloader(videos, job_manager).generate(list(videos), iter_ranges)
+    next(chunks)
+    while job_manager.calls == 0:
+        time.sleep(0.01)
+    chunks.close()
+
+    time.sleep(0.1)
+    calls = job_manager.calls
+    time.sleep(0.2)
+    assert job_manager.calls == calls
+
+    def batch_threads():
+        return [t for t in threading.enumerate() if t.name.startswith('batch')]
+
+    deadline = time.monotonic() + 5
+    while batch_threads() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not batch_threads()
@@ -0,0 +1,179 @@
+# tests/test_cache.py
+import json
+import time
+
+import pytest
+import pytubefix
+from pytubefix import YouTube, request
+from pytubefix.innertube import InnerTube
+
+from api import cache
+from api.cache import EXPIRE_MARGIN, MemoryBackend, MetadataCache, SQLiteBackend, _url_expiry
+
+VIDEO_ID = 'aqz-KE-bpKQ'
+URL = f'https://www.youtube.com/watch?v={VIDEO_ID}'
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend_factory(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryBackend
+    return lambda max_bytes: SQLiteBackend(str(tmp_path / 'cache.sqlite3'), max_bytes)
+
+
+def test_least_recently_used_entry_is_evicted(backend_factory, monkeypatch):
+    backend = backend_factory(max_bytes=25)
+    expires = time.time() + 60
+    now = time.time()
+    for key in ('a', 'b'):
+        # SQLite는 accessed 시각으로 순서를 정하므로 시각을 조금씩 늘림
+        now += 1
+        monkeypatch.setattr(cache.time, 'time', lambda now=now: now)
+        backend.set(key, key * 10, expires)
+    now += 1
+    monkeypatch.setattr(cache.time, 'time', lambda: now)
+    assert backend.get('a') == 'a' * 10
+
+    now += 1
+    monkeypatch.setattr(cache.time, 'time', lambda: now)
+    backend.set('c', 'c' * 10, expires)
+
+    assert backend.get('b') is None
+    assert backend.get('a') == 'a' * 10
+    assert backend.get('c') == 'c' * 10
+
+
+def test_expired_entry_is_not_returned(backend_factory):
+    backend = backend_factory(max_bytes=1024)
+    backend.set('old', 'value', time.time() - 1)
+    backend.set('new', 'value', time.time() + 60)
+    assert backend.get('old') is None
+    assert backend.get('new') == 'value'
+
+
+def test_sqlite_stats_are_shared_between_instances(tmp_path):
+    # 같은 파일을 여는 두 저장소 = 같은 호스트의 두 워커
+    path = str(tmp_path / 'cache.sqlite3')
+    first, second = SQLiteBackend(path), SQLiteBackend(path)
+    first.set('a', 'value', time.time() + 60)
+    first.count('hits')
+    second.count('hits')
+    second.count('misses')
+    assert first.stats() == {'hits': 2, 'misses': 1, 'entries': 1, 'bytes': 5}
+
+
+def _vid_info(expire=None, expires_in=None):
+    def fmt(itag, mime_type, **extra):
+        url = f'https://rr1---sn.googlevideo.com/videoplayback?itag={itag}'
+        if expire is not None:
+            # 비디오 포맷 하나의 URL이 가장 먼저 만료됨
+            url += f'&expire={expire if itag == 136 else expire + 3600}'
+        return dict({'itag': itag, 'url': url, 'mimeType': mime_type, 'bitrate': 1000000,
+                     'contentLength': '1000000', 'approxDurationMs': '60000', 'lastModified': '1',
+                     'is_otf': False}, **extra)
+
+    streaming_data = {
+        'formats': [fmt(18, 'video/mp4; codecs="avc1.42001E, mp4a.40.2"', width=640, height=360, fps=30)],
+        'adaptiveFormats': [fmt(136, 'video/mp4; codecs="avc1.4d401f"', width=1280, height=720, fps=30),
+                            fmt(140, 'audio/mp4; codecs="mp4a.40.2"', averageBitrate=128000)],
+    }
+    if expires_in is not None:
+        streaming_data['expiresInSeconds'] = str(expires_in)
+    return {
+        'playabilityStatus': {'status': 'OK'},
+        'videoDetails': {'videoId': VIDEO_ID, 'title': 'Cached video', 'lengthSeconds': '60', 'author': 'test',
+                         'shortDescription': '', 'viewCount': '1', 'keywords': [],
+                         'thumbnail': {'thumbnails': [{'url': 'https://i.ytimg.com/vi/x/hq.jpg'}]}},
+        'streamingData': streaming_data,
+        'playerConfig': {'mediaCommonConfig': {'mediaUstreamerRequestConfig': {
+            'videoPlaybackUstreamerConfig': 'AAAA'}}},
+    }
+
+
+def test_url_expiry_uses_earliest_expire_parameter():
+    assert _url_expiry(_vid_info(expire=2000000000, expires_in=60)) == 2000000000
+
+
+def test_url_expiry_falls_back_to_expires_in_seconds(monkeypatch):
+    monkeypatch.setattr(cache.time, 'time', lambda: 1000.0)
+    assert _url_expiry(_vid_info(expires_in=21540)) == 1000.0 + 21540
+    assert _url_expiry(_vid_info()) is None
+
+
+class _Extracted:
+    """YouTube(url).streams 추출을 흉내 내는 대역"""
+
+    def __init__(self, vid_info):
+        self.vid_info = vid_info
+        self.client = 'WEB'
+        self.po_token = None
+        self.streams = []
+
+
+def _metadata_cache(backend=None):
+    metadata_cache = MetadataCache(backend or MemoryBackend())
+    # 플레이어 캐시 연결(pytubefix 전역 설정)은 이 테스트와 관계없음
+    metadata_cache.player_cache = object()
+    return metadata_cache
+
+
+@pytest.mark.parametrize('expire, stored', [
+    (lambda now: now + EXPIRE_MARGIN + 60, True),
+    (lambda now: now + EXPIRE_MARGIN - 60, False),
+])
+def test_entries_expire_before_urls(monkeypatch, expire, stored):
+    now = time.time()
+    vid_info = _vid_info(expire=int(expire(now)))
+    metadata_cache = _metadata_cache()
+    monkeypatch.setattr(pytubefix, 'YouTube', lambda url, client: _Extracted(vid_info))
+    metadata_cache.get_youtube(URL)
+
+    value = metadata_cache.backend.get(f'WEB:{VIDEO_ID}')
+    assert (value is not None) == stored
+
+
+def _no_network(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError('캐시 적중인데 네트워크 요청을 보냄')
+
+    for name in ('get', 'post', 'stream'):
+        monkeypatch.setattr(request, name, fail)
+    monkeypatch.setattr(InnerTube, 'player', fail)
+    monkeypatch.setattr(YouTube, 'watch_html', property(fail))
+    monkeypatch.setattr(YouTube, 'js', property(fail))
+
+
+def test_hit_restores_youtube_without_network(monkeypatch):
+    metadata_cache = _metadata_cache()
+    vid_info = _vid_info(expire=int(time.time()) + 20000)
+    metadata_cache.backend.set(f'WEB:{VIDEO_ID}', json.dumps({'client': 'WEB', 'po_token': None,
+                                                             'vid_info': vid_info}), time.time() + 60)
+    _no_network(monkeypatch)
+
+    yt = metadata_cache.get_youtube(URL)
+
+    assert isinstance(yt, YouTube)
+    assert yt.title == 'Cached video' and yt.length == 60
+    assert [s.itag for s in yt.streams] == [18, 136, 140]
+    assert yt.streams.get_by_itag(136).url == vid_info['streamingData']['adaptiveFormats'][0]['url']
+    assert yt.streams.get_by_itag(140).includes_audio_track
+    assert yt.video_playback_ustreamer_config == 'AAAA'
+    assert metadata_cache.stats()['hits'] == 1 and metadata_cache.stats()['misses'] == 0
+
+
+def test_unreadable_entry_falls_back_to_extraction(monkeypatch):
+    metadata_cache = _metadata_cache()
+    metadata_cache.backend.set(f'WEB:{VIDEO_ID}', json.dumps({'vid_info': {}}), time.time() + 60)
+    vid_info = _vid_info(expire=int(time.time()) + 20000)
+    extracted = []
+    monkeypatch.setattr(pytubefix, 'YouTube',
+                        lambda url, client: extracted.append(url) or _Extracted(vid_info))
+
+    yt = metadata_cache.get_youtube(URL)
+
+    assert isinstance(yt, _Extracted)
+    # 복원을 시도하며 한 번, 다시 추출하며 한 번
+    assert len(extracted) == 2
+    assert metadata_cache.stats()['misses'] == 1
+    # 새로 추출한 결과로 항목을 덮어씀
+    assert json.loads(metadata_cache.backend.get(f'WEB:{VIDEO_ID}'))['vid_info'] == vid_info
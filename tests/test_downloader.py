@@ -0,0 +1,79 @@
+# tests/test_downloader.py
+import os
+
+import pytest
+
+from api import downloader
+from api.downloader import DownloadError, iter_ranges
+from tests.http_stub import FileServer
+
+SEGMENT = 64 * 1024
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / 'video.mp4').write_bytes(os.urandom(5 * SEGMENT + 123))
+    with FileServer(str(tmp_path)) as server:
+        yield server
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """풀이 새로 만든 연결을 모두 기록"""
+    made = []
+    connect = downloader.pool.connect
+
+    def recording_connect(scheme, netloc):
+        conn = connect(scheme, netloc)
+        made.append(conn)
+        return conn
+
+    monkeypatch.setattr(downloader.pool, 'connect', recording_connect)
+    monkeypatch.setattr(downloader, 'RETRY_BACKOFF', 0.01)
+    return made
+
+
+def _expected(server):
+    with open(os.path.join(server.directory, 'video.mp4'), 'rb') as f:
+        return f.read()
+
+
+def _starts(server):
+    return [start for _, start, _ in server.requests]
+
+
+def test_transient_statuses_are_retried(server, connections):
+    # 첫 구간(크기 확인)은 503, 그 뒤 구간 하나는 429 후 502
+    server.fail('video.mp4', 503, None, 429, 502)
+    data = b''.join(iter_ranges(server.url('video.mp4'), workers=1, segment_size=SEGMENT))
+
+    assert data == _expected(server)
+    assert _starts(server) == [0, 0, SEGMENT, SEGMENT, SEGMENT] + [SEGMENT * i for i in range(2, 6)]
+
+
+def test_client_errors_are_not_retried(server, connections):
+    server.fail('video.mp4', None, 403)
+    with pytest.raises(DownloadError, match='HTTP 403'):
+        b''.join(iter_ranges(server.url('video.mp4'), workers=1, segment_size=SEGMENT))
+    assert _starts(server).count(SEGMENT) == 1
+
+
+def test_retries_are_bounded(server, connections):
+    server.fail('video.mp4', None, *[503] * 10)
+    with pytest.raises(DownloadError, match='HTTP 503'):
+        b''.join(iter_ranges(server.url('video.mp4'), workers=1, segment_size=SEGMENT, retries=2))
+    # 처음 요청 + 재시도 2번
+    assert _starts(server).count(SEGMENT) == 3
+
+
+def test_connection_failing_mid_read_is_closed(server, connections, monkeypatch):
+    # 본문을 읽는 도중 시간 초과(OSError)가 나는 연결
+    monkeypatch.setattr(downloader.pool, 'timeout', 0.2)
+    server.fail('video.mp4', None, 'stall')
+    data = b''.join(iter_ranges(server.url('video.mp4'), workers=1, segment_size=SEGMENT))
+
+    assert data == _expected(server)
+    # 실패한 연결은 풀에 남지 않고 닫혀 있어야 함
+    idle = downloader.pool._idle.get(('http', server.base_url.split('//')[1]), [])
+    assert all(conn.sock is None for conn in connections if conn not in idle)
+    assert any(conn.sock is None for conn in connections)
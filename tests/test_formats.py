@@ -0,0 +1,83 @@
+# tests/test_formats.py
+import copy
+import json
+import os
+from types import SimpleNamespace
+
+from pytubefix import extract
+from pytubefix.monostate import Monostate
+from pytubefix.query import StreamQuery
+from pytubefix.streams import Stream
+
+from api.formats import FormatTable, format_table
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'streaming_data.json')
+
+
+def load_streams():
+    """fixtures/streaming_data.json을 pytubefix가 만드는 것과 같은 Stream 목록으로 변환"""
+    with open(FIXTURE, encoding='utf-8') as f:
+        streaming_data = json.load(f)
+    monostate = Monostate(on_progress=None, on_complete=None)
+    return [Stream(stream, monostate, po_token=None, video_playback_ustreamer_config=None)
+            for stream in extract.apply_descrambler(copy.deepcopy(streaming_data))]
+
+
+def old_rows(streams):
+    """변경 전 get_streams의 filter().order_by() 체인과 중복 제거 (611bbeb^:api/index.py)"""
+    all_video_streams = []
+    for stream in streams.filter(progressive=True, file_extension='mp4').order_by('resolution').desc():
+        all_video_streams.append({'stream': stream, 'type': 'progressive', 'has_audio': True,
+                                  'resolution': stream.resolution})
+    adaptive_video_streams = streams.filter(adaptive=True, type='video', file_extension='mp4') \
+        .order_by('resolution').desc()
+    best_audio = streams.filter(only_audio=True).order_by('abr').desc().first()
+    for stream in adaptive_video_streams:
+        all_video_streams.append({'stream': stream, 'type': 'adaptive', 'has_audio': False,
+                                  'resolution': stream.resolution, 'audio_stream': best_audio})
+
+    seen_resolutions = set()
+    unique_video_streams = []
+    for item in all_video_streams:
+        resolution = item['resolution']
+        if resolution and resolution not in seen_resolutions:
+            seen_resolutions.add(resolution)
+            unique_video_streams.append(item)
+    unique_video_streams.sort(key=lambda item: int(item['resolution'].replace('p', '')), reverse=True)
+    audio_streams = streams.filter(only_audio=True).order_by('abr').desc()
+    return unique_video_streams, audio_streams
+
+
+def test_fixture_has_hundreds_of_formats():
+    assert len(load_streams()) >= 300
+
+
+def test_best_per_resolution_matches_old_chains():
+    streams = load_streams()
+    old, old_audio = old_rows(StreamQuery(streams))
+    table = FormatTable(streams)
+    new = table.best_per_resolution(container='mp4')
+
+    assert [(row['resolution'], row['type']) for row in new] == \
+        [(row['resolution'], row['type']) for row in old]
+    for row in new:
+        stream = row['stream']
+        assert stream.resolution == row['resolution'] and stream.subtype == 'mp4'
+        if row['type'] == 'adaptive':
+            # MP4에는 -c copy로 넣을 수 있는 AAC 오디오를 짝지음
+            assert row['audio_stream'].audio_codec.startswith('mp4a')
+    assert [s.abr for s in table.audio_by_abr()] == [s.abr for s in old_audio]
+
+
+def test_max_height_and_codec_preference():
+    table = FormatTable(load_streams(), video_preference=['av1', 'h264'])
+    rows = table.best_per_resolution(container='mp4', max_height=1080)
+    assert rows[0]['resolution'] == '1080p'
+    assert all(row['stream'].video_codec.startswith('av01') for row in rows if row['type'] == 'adaptive')
+    # 같은 해상도에서는 progressive가 우선
+    assert [row['type'] for row in rows if row['resolution'] == '360p'] == ['progressive']
+
+
+def test_format_table_is_built_once_per_video():
+    yt = SimpleNamespace(fmt_streams=load_streams())
+    assert format_table(yt) is format_table(yt)
@@ -0,0 +1,181 @@
+# tests/test_jobs.py
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from api import index, jobs
+from api.jobs import Job, JobManager, JobQueueFull, OutputStore, output_key
+
+URL = 'https://www.youtube.com/watch?v=a'
+
+
+def _video(video_id='a'):
+    streams = {136: SimpleNamespace(itag=136, resolution='720p', filesize=1000),
+               137: SimpleNamespace(itag=137, resolution='1080p', filesize=2000),
+               140: SimpleNamespace(itag=140, resolution=None, filesize=500)}
+    return SimpleNamespace(video_id=video_id, title='Clip', length=10,
+                           streams=SimpleNamespace(get_by_itag=streams.get))
+
+
+@pytest.fixture
+def release(monkeypatch):
+    """ffmpeg 대신 입력을 모두 읽고 파일을 쓰는 병합. 반환한 Event가 설정될 때까지 멈춤"""
+    event = threading.Event()
+
+    def open_streams(video_stream, audio_stream, workers):
+        return iter([b'v' * video_stream.filesize]), iter([b'a' * audio_stream.filesize])
+
+    def merge_to_file(video_chunks, audio_chunks, path, on_progress):
+        event.wait(5)
+        data = b''.join(video_chunks) + b''.join(audio_chunks)
+        on_progress(10)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    monkeypatch.setattr(jobs, 'open_streams', open_streams)
+    monkeypatch.setattr(jobs, 'merge_to_file', merge_to_file)
+    yield event
+    event.set()
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return JobManager(OutputStore(str(tmp_path / 'output')), max_pending=2)
+
+
+def test_same_output_shares_one_job(manager, release):
+    yt = _video()
+    streams = yt.streams.get_by_itag
+    first = manager.submit(yt, streams(136), streams(140), 'a.mp4')
+    second = manager.submit(yt, streams(136), streams(140), 'a.mp4')
+    other = manager.submit(yt, streams(137), streams(140), 'b.mp4')
+
+    assert second is first
+    assert other is not first
+    release.set()
+    assert first.done.wait(5) and other.done.wait(5)
+    assert first.status == 'finished' and first.progress() == 100.0
+    assert os.path.getsize(first.path) == 1500
+    assert first.downloaded == first.total_bytes == 1500
+
+    # 끝난 작업은 공유하지 않고, 남아 있는 결과 파일로 바로 완료된 작업을 만듦
+    cached = manager.submit(yt, streams(136), streams(140), 'a.mp4')
+    assert cached is not first
+    assert cached.status == 'finished' and cached.path == first.path
+
+
+def test_queue_full_once_max_pending_is_reached(manager, release):
+    yt = _video()
+    streams = yt.streams.get_by_itag
+    manager.submit(yt, streams(136), streams(140), 'a.mp4')
+    manager.submit(yt, streams(137), streams(140), 'b.mp4')
+    with pytest.raises(JobQueueFull):
+        manager.submit(_video('b'), streams(136), streams(140), 'c.mp4')
+
+
+def test_progress_weighs_download_and_merge_equally():
+    job = Job('key', 'a.mp4')
+    assert job.progress() == 0
+    job.total_bytes, job.downloaded = 1000, 500
+    job.duration, job.merged_seconds = 10, 2.5
+    assert job.progress() == 25 + 12.5
+    # 추정치보다 많이 받아도 각 단계는 절반을 넘지 않음
+    job.downloaded = 2000
+    assert job.progress() == 50 + 12.5
+    job.status = 'finished'
+    assert job.progress() == 100.0
+
+
+def _write(store, name, size, atime):
+    path = store.path(name)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    os.utime(path, (atime, atime))
+    return path
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    store = OutputStore(str(tmp_path), max_bytes=250)
+    now = time.time()
+    oldest = _write(store, 'oldest.mp4', 100, now - 300)
+    older = _write(store, 'older.mp4', 100, now - 200)
+    recent = _write(store, 'recent.mp4', 100, now - 100)
+    # 임시 파일(.으로 시작)은 정리 대상이 아님
+    partial = _write(store, '.partial.mp4.part', 100, now - 400)
+
+    store.evict()
+
+    assert not os.path.exists(oldest)
+    assert os.path.exists(older) and os.path.exists(recent) and os.path.exists(partial)
+
+
+def test_evict_keeps_the_given_file(tmp_path):
+    store = OutputStore(str(tmp_path), max_bytes=150)
+    now = time.time()
+    oldest = _write(store, 'oldest.mp4', 100, now - 300)
+    older = _write(store, 'older.mp4', 100, now - 200)
+
+    store.evict(keep=oldest)
+
+    assert os.path.exists(oldest) and not os.path.exists(older)
+
+
+def test_lookup_marks_the_file_as_used(tmp_path):
+    store = OutputStore(str(tmp_path), max_bytes=150)
+    now = time.time()
+    first = _write(store, 'first.mp4', 100, now - 300)
+    second = _write(store, 'second.mp4', 100, now - 200)
+
+    assert store.lookup('first.mp4') == first
+    store.evict()
+
+    assert os.path.exists(first) and not os.path.exists(second)
+    assert store.lookup('second.mp4') is None
+
+
+@pytest.fixture
+def client(monkeypatch, manager):
+    monkeypatch.setattr(index, 'job_manager', manager)
+    monkeypatch.setattr(index, 'metadata_cache', SimpleNamespace(get_youtube=lambda url: _video()))
+    with index.app.test_client() as client:
+        yield client
+
+
+def test_post_jobs_returns_503_when_the_queue_is_full(client, manager, release):
+    manager.max_pending = 0
+    response = client.post('/jobs', json={'url': URL, 'itag': 136, 'audio_itag': 140})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '30'
+
+
+@pytest.mark.parametrize('params', [
+    {'url': URL, 'itag': '136'},
+    {'url': URL, 'itag': 'best', 'audio_itag': '140'},
+    {'url': URL, 'itag': '136', 'audio_itag': [140]},
+])
+def test_post_jobs_rejects_invalid_parameters(client, params):
+    assert client.post('/jobs', json=params).status_code == 400
+
+
+def test_job_file_while_running_finished_and_evicted(client, manager, release):
+    response = client.post('/jobs', data={'url': URL, 'itag': '136', 'audio_itag': '140'})
+    assert response.status_code == 202
+    job_id = response.get_json()['id']
+
+    running = client.get(f'/jobs/{job_id}/file')
+    assert running.status_code == 409
+    assert running.get_json()['status'] in ('queued', 'running')
+
+    release.set()
+    assert manager.get(job_id).done.wait(5)
+    assert client.get(f'/jobs/{job_id}').get_json()['progress'] == 100.0
+    finished = client.get(f'/jobs/{job_id}/file')
+    assert finished.status_code == 200 and len(finished.get_data()) == 1500
+    finished.close()
+
+    os.remove(manager.store.path(output_key('a', 136, 140) + '.mp4'))
+    assert client.get(f'/jobs/{job_id}/file').status_code == 410
+    assert client.get('/jobs/unknown/file').status_code == 404
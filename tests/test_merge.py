@@ -0,0 +1,41 @@
+# tests/test_merge.py
+import time
+
+from api.downloader import iter_ranges
+from api.merge import merge_streams
+from tests.conftest import requires_ffmpeg
+from tests.http_stub import FileServer
+
+
+@requires_ffmpeg
+def test_first_bytes_arrive_before_inputs_finish(media):
+    video, audio = media
+    # 연결당 128KB/s, 64KB 구간 4개씩 → 비디오 입력을 다 받는 데 약 1초 걸림
+    with FileServer(video.parent, rate=128 * 1024) as server:
+        started = time.monotonic()
+        first_chunk_at = None
+        output = bytearray()
+        for chunk in merge_streams(iter_ranges(server.url('video.mp4'), segment_size=64 * 1024),
+                                   iter_ranges(server.url('audio.m4a'), segment_size=64 * 1024)):
+            if first_chunk_at is None:
+                first_chunk_at = time.monotonic()
+            output += chunk
+
+    assert first_chunk_at is not None
+    assert first_chunk_at < server.finished['video.mp4']
+    assert server.finished['video.mp4'] - started > 0.5
+    # fragmented MP4: ftyp 다음에 (빈) moov가 바로 옴
+    assert output[4:8] == b'ftyp'
+    assert b'moov' in output[:4096] and b'moof' in output
+
+
+@requires_ffmpeg
+def test_closing_the_generator_stops_ffmpeg(media):
+    video, audio = media
+    with FileServer(video.parent, rate=128 * 1024) as server:
+        chunks = merge_streams(iter_ranges(server.url('video.mp4'), segment_size=64 * 1024),
+                               iter_ranges(server.url('audio.m4a'), segment_size=64 * 1024))
+        next(chunks)
+        started = time.monotonic()
+        chunks.close()
+        assert time.monotonic() - started < 5
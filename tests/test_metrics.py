@@ -0,0 +1,57 @@
+# tests/test_metrics.py
+import contextlib
+import os
+import subprocess
+import sys
+
+from api import metrics
+from api.downloader import iter_ranges
+from api.merge import merge_streams
+from api.metrics import Registry
+from tests.conftest import requires_ffmpeg
+from tests.http_stub import FileServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _find(tree, stage):
+    name, children = tree
+    if name == stage:
+        return [tree]
+    return [found for child in children for found in _find(child, stage)]
+
+
+@requires_ffmpeg
+def test_merge_span_tree(media):
+    video, audio = media
+    with FileServer(video.parent) as server, metrics.span('send') as root:
+        for _ in merge_streams(iter_ranges(server.url('video.mp4'), segment_size=128 * 1024),
+                               iter_ranges(server.url('audio.m4a'), segment_size=128 * 1024)):
+            pass
+
+    stage, children = root.tree()
+    assert stage == 'send'
+    assert [child[0] for child in children] == ['ffmpeg']
+    downloads = _find(children[0], 'download')
+    # 비디오/오디오 입력마다 download 구간이 하나씩, 그 아래에 구간 다운로드들
+    assert len(downloads) == 2
+    segments = [len(_find(download, 'segment')) for download in downloads]
+    assert sorted(segments) == sorted([-(-os.path.getsize(p) // (128 * 1024)) for p in (video, audio)])
+    assert root.duration is not None
+
+
+def test_disabled_registry_records_nothing():
+    registry = Registry(enabled=False)
+    assert isinstance(registry.span('send'), contextlib.nullcontext)
+    with registry.span('send'):
+        registry.inc('ytdl_download_bytes_total', 10)
+    assert registry.render() == '\n'
+
+
+def test_metrics_enabled_env():
+    code = ('import contextlib; from api import metrics; '
+            'print(isinstance(metrics.span("send"), contextlib.nullcontext))')
+    for value, expected in (('0', 'True'), ('1', 'False')):
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, capture_output=True,
+                                text=True, env=dict(os.environ, METRICS_ENABLED=value)).stdout
+        assert output.strip() == expected
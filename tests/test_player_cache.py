@@ -0,0 +1,118 @@
+# tests/test_player_cache.py
+import os
+
+import pytest
+import pytubefix
+from pytubefix import YouTube, extract, cipher as yt_cipher
+from pytubefix.cipher import Cipher
+
+from api import player_cache
+from api.player_cache import PlayerCache
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'player')
+JS_URL = 'https://www.youtube.com/s/player/fixture/player_ias.vflset/en_US/base.js'
+
+
+@pytest.fixture
+def js():
+    with open(os.path.join(FIXTURES, 'base.js'), encoding='utf-8') as f:
+        return f.read()
+
+
+def test_cached_cipher_matches_pytubefix(tmp_path, js):
+    plain = Cipher(js, JS_URL)
+    cached = PlayerCache(str(tmp_path)).cipher(js, JS_URL)
+
+    for n in ('abcdefghijklmnop', 'Xy_-0123456789', 'q'):
+        assert cached.get_throttling(n) == plain.get_throttling(n)
+    signature = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+    assert cached.get_signature(signature) == plain.get_signature(signature)
+
+
+def test_functions_are_extracted_once(tmp_path, js, monkeypatch):
+    cached = PlayerCache(str(tmp_path)).cipher(js, JS_URL)
+    extracted = []
+    extract_function = cached.js_interpreter.extract_function
+    monkeypatch.setattr(cached.js_interpreter, 'extract_function',
+                        lambda name: extracted.append(name) or extract_function(name))
+
+    for i in range(5):
+        cached.get_throttling(f'n{i}abcdef')
+        cached.get_signature(f's{i}abcdefghijklmnopqrstuvwxyz0123456789')
+
+    assert sorted(extracted) == ['Bp', 'Uy']
+
+
+def test_saved_plan_skips_function_name_search(tmp_path, js, monkeypatch):
+    first = PlayerCache(str(tmp_path)).cipher(js, JS_URL)
+    # 첫 변환 결과와 함께 plan이 디스크에 저장됨
+    expected = first.get_throttling('abcdefghijklmnop')
+
+    def fail(*args):
+        raise AssertionError('함수 이름을 다시 찾으면 안 됨')
+
+    monkeypatch.setattr(player_cache, 'get_initial_function_name', fail)
+    monkeypatch.setattr(player_cache, 'get_throttling_function_name', fail)
+    monkeypatch.setattr(yt_cipher.JSInterpreter, 'call_function', fail)
+    second = PlayerCache(str(tmp_path)).cipher(js, JS_URL)
+    assert second.get_throttling('abcdefghijklmnop') == expected
+
+
+@pytest.fixture
+def installed(monkeypatch):
+    """install()이 바꾸는 pytubefix 전역 상태를 테스트가 끝나면 되돌림"""
+    monkeypatch.setattr(YouTube, 'js', YouTube.js)
+    monkeypatch.setattr(extract, 'Cipher', extract.Cipher)
+    monkeypatch.setattr(pytubefix, '__js__', None)
+    monkeypatch.setattr(pytubefix, '__js_url__', None)
+    downloads = []
+    monkeypatch.setattr(player_cache.yt_request, 'get', lambda url: downloads.append(url) or FRESH_JS)
+    return downloads
+
+
+FRESH_JS = '// 새로 받은 플레이어'
+
+
+def _youtube():
+    yt = YouTube('https://www.youtube.com/watch?v=aqz-KE-bpKQ')
+    yt._js_url = JS_URL
+    return yt
+
+
+def test_preloaded_player_is_used_on_first_request(tmp_path, js, installed):
+    seeded = PlayerCache(str(tmp_path))
+    seeded._write(seeded._path(JS_URL, '.js'), js)
+    seeded.cipher(js, JS_URL)
+
+    # 포크 전 마스터에서 하는 일: 디스크의 플레이어를 미리 불러오고 연결
+    cache = PlayerCache(str(tmp_path))
+    assert cache.preload() == 1
+    player_cache.install(cache)
+
+    assert _youtube().js == js
+    assert installed == []
+    assert os.path.exists(cache._path(JS_URL, '.js'))
+    assert os.path.exists(cache._path(JS_URL, '.json'))
+    # 다른 요청(다른 YouTube 객체)도 같은 플레이어를 그대로 사용
+    assert _youtube().js == js
+    assert installed == []
+
+
+def test_extract_error_retry_forgets_the_player(tmp_path, js, installed):
+    cache = PlayerCache(str(tmp_path))
+    cache._write(cache._path(JS_URL, '.js'), js)
+    player_cache.install(cache)
+
+    yt = _youtube()
+    assert yt.js == js
+    # YouTube.fmt_streams가 ExtractError 뒤 하는 초기화
+    yt._js = None
+    yt._js_url = None
+    pytubefix.__js__ = None
+    pytubefix.__js_url__ = None
+    yt._js_url = JS_URL
+
+    assert yt.js == FRESH_JS
+    assert installed == [JS_URL]
+    with open(cache._path(JS_URL, '.js'), encoding='utf-8') as f:
+        assert f.read() == FRESH_JS
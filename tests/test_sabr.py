@@ -0,0 +1,225 @@
+# tests/test_sabr.py
+import io
+import json
+import os
+import shutil
+import subprocess
+import threading
+import types
+
+import pytest
+
+from api import sabr
+from api.merge import MergeError, merge_to_file
+from api.sabr import PART_MEDIA_HEADER, ReplayFetcher, SabrSession, SabrStreamError, iter_ump_parts
+from tests.conftest import requires_ffmpeg
+from tests.fixtures.make_sabr_session import sabr_bytes, split_segments, ump_part
+from tests.http_stub import FileServer
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'sabr')
+SESSION = os.path.join(FIXTURES, 'session')
+
+
+def _read(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+def _sabr_bytes(name):
+    return sabr_bytes(os.path.join(FIXTURES, name))
+
+
+def _streams(server=None):
+    """기록의 streams.json으로 스트림 대역을 만듦. server가 있으면 직접 URL도 가짐"""
+    with open(os.path.join(SESSION, 'streams.json')) as f:
+        info = json.load(f)
+    names = {'video': 'video.mp4', 'audio': 'audio.m4a'}
+    return [types.SimpleNamespace(is_sabr=server is None, url=server.url(names[kind]) if server else None,
+                                  _monostate=None, **info[kind])
+            for kind in ('video', 'audio')]
+
+
+def test_replay_yields_recorded_tracks():
+    # 작은 버퍼로 생산자가 소비자를 기다리는 경로와 중복 구간 제거를 함께 확인
+    session = SabrSession(*_streams(), url='replay', fetch=ReplayFetcher(SESSION), buffer_bytes=8 * 1024)
+    video, audio = session.chunks('video'), session.chunks('audio')
+    results = {}
+    thread = threading.Thread(target=lambda: results.setdefault('audio', b''.join(audio)))
+    thread.start()
+    results['video'] = b''.join(video)
+    thread.join(timeout=10)
+
+    # 인덱스(sidx) 구간을 뺀 원본 그대로
+    assert results['video'] == _sabr_bytes('video.mp4')
+    assert results['audio'] == _sabr_bytes('audio.m4a')
+    assert session.video.position == len(_read('video.mp4'))
+    assert session.requests == len([n for n in os.listdir(SESSION) if n.endswith('.ump')])
+
+
+@requires_ffmpeg
+def test_replay_through_merge_to_file(tmp_path):
+    output = tmp_path / 'merged.mp4'
+    session = sabr.replay(SESSION, str(output))
+
+    assert session.video.offset == len(_sabr_bytes('video.mp4'))
+    assert session.audio.offset == len(_sabr_bytes('audio.m4a'))
+    streams = subprocess.run(['ffmpeg', '-hide_banner', '-i', str(output)], capture_output=True, text=True).stderr
+    assert 'Video: h264' in streams and 'Audio: aac' in streams
+
+
+def _recording(tmp_path, second):
+    """첫 응답은 그대로, 두 번째 응답은 second(bytes)로 바꾼 기록과 원본 파일을 tmp_path에 준비
+
+    그 뒤 요청은 FileServer가 503으로 응답합니다.
+    """
+    recording = tmp_path / 'sabr'
+    recording.mkdir()
+    shutil.copy(os.path.join(SESSION, '000000.ump'), recording)
+    (recording / '000001.ump').write_bytes(second)
+    for name in ('video.mp4', 'audio.m4a'):
+        shutil.copy(os.path.join(FIXTURES, name), tmp_path)
+
+
+def _fall_back(tmp_path):
+    with FileServer(str(tmp_path)) as server:
+        session = SabrSession(*_streams(server), url=server.url('sabr'))
+        video = b''.join(session.chunks('video', workers=2))
+        audio = b''.join(session.chunks('audio', workers=2))
+    starts = {name: start for name, start, _ in server.requests}
+    return session, video, audio, starts
+
+
+def _rewrite_headers(data, change):
+    """응답의 MediaHeader 파트를 change(dict)로 고쳐 다시 인코딩"""
+    from pytubefix.sabr.video_streaming.media_header import MediaHeader
+
+    body = b''
+    for part_type, part in iter_ump_parts(io.BytesIO(data)):
+        if part_type == PART_MEDIA_HEADER:
+            header = vars(MediaHeader.decode(part))
+            change(header)
+            part = bytes(MediaHeader.encode(header).finish())
+        body += ump_part(part_type, part)
+    return body
+
+
+def test_cut_off_session_falls_back_to_ranges(tmp_path):
+    # 두 번째 응답이 구간 중간에서 끊기고 그 뒤 요청은 503
+    second = _read(os.path.join('session', '000001.ump'))
+    _recording(tmp_path, second[:len(second) // 2])
+
+    session, video, audio, starts = _fall_back(tmp_path)
+
+    assert isinstance(session.error, Exception)
+    # SABR로 받은 부분(sidx 없음)과 이어받은 나머지가 정확히 맞물림
+    assert video == _sabr_bytes('video.mp4')
+    assert audio == _sabr_bytes('audio.m4a')
+    # 구간 다운로드는 내보낸 바이트 수가 아니라 원본 파일 위치에서 시작
+    for name, track in (('video.mp4', session.video), ('audio.m4a', session.audio)):
+        _, index, segments = split_segments(_read(name))
+        assert starts[name] == track.position
+        assert track.offset == track.position - (index[1] - index[0])
+        assert segments[0][0] < track.position < segments[-1][0]
+
+
+def test_discontiguous_segment_falls_back_from_last_position(tmp_path):
+    def shift(header):
+        if header['itag'] == 136 and header['sequenceNumber'] == 2:
+            header['startRange'] += 100
+
+    _recording(tmp_path, _rewrite_headers(_read(os.path.join('session', '000001.ump')), shift))
+
+    session, video, audio, starts = _fall_back(tmp_path)
+
+    assert '이어지지 않습니다' in str(session.error)
+    # 어긋난 구간은 버리고 마지막으로 끝까지 받은 구간의 끝부터 이어받음
+    _, _, segments = split_segments(_read('video.mp4'))
+    assert starts['video.mp4'] == segments[0][1]
+    assert video == _sabr_bytes('video.mp4')
+    assert audio == _sabr_bytes('audio.m4a')
+
+
+def test_compressed_segment_is_not_passed_through(tmp_path):
+    def compress(header):
+        if header['itag'] == 140 and header['sequenceNumber'] == 2:
+            header['compressionAlgorithm'] = 1
+
+    _recording(tmp_path, _rewrite_headers(_read(os.path.join('session', '000001.ump')), compress))
+
+    session, video, audio, _ = _fall_back(tmp_path)
+
+    assert '압축' in str(session.error)
+    assert video == _sabr_bytes('video.mp4')
+    assert audio == _sabr_bytes('audio.m4a')
+
+
+def test_cut_off_session_without_direct_url_fails():
+    replay = ReplayFetcher(SESSION)
+
+    def fetch(url, body):
+        if replay.requests >= 1:
+            raise SabrStreamError('HTTP 503')
+        return replay(url, body)
+
+    session = SabrSession(*_streams(), url='replay', fetch=fetch)
+    with pytest.raises(SabrStreamError):
+        b''.join(session.chunks('video'))
+
+
+def test_consumer_leaving_stops_the_other_track():
+    session = SabrSession(*_streams(), url='replay', fetch=ReplayFetcher(SESSION), buffer_bytes=1024)
+    audio = session.chunks('audio')
+    next(audio)
+    outcome = {}
+
+    def consume_video():
+        try:
+            for _ in session.chunks('video'):
+                pass
+            outcome['result'] = 'finished'
+        except SabrStreamError as e:
+            outcome['result'] = e
+
+    thread = threading.Thread(target=consume_video, daemon=True)
+    thread.start()
+    audio.close()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert isinstance(outcome['result'], SabrStreamError)
+    session._thread.join(timeout=5)
+    assert not session._thread.is_alive()
+
+
+def test_each_recorded_session_gets_its_own_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv('SABR_RECORD_DIR', str(tmp_path))
+    monostate = types.SimpleNamespace(youtube=types.SimpleNamespace(video_id='aqz-KE-bpKQ'))
+    video, audio = _streams()
+    video.url = audio.url = 'https://rr1---sn.googlevideo.com/videoplayback?sabr=1'
+    video._monostate = audio._monostate = monostate
+
+    for _ in range(2):
+        sabr.open_streams(video, audio)
+
+    directories = sorted(os.listdir(tmp_path))
+    assert len(directories) == 2
+    for name in directories:
+        assert name.startswith('aqz-KE-bpKQ-')
+        assert os.listdir(tmp_path / name) == ['streams.json']
+
+
+@requires_ffmpeg
+def test_merge_does_not_wait_forever_for_a_stuck_input(tmp_path, monkeypatch):
+    monkeypatch.setattr('api.merge.FEED_JOIN_TIMEOUT', 0.5)
+    release = threading.Event()
+
+    def stuck():
+        release.wait()
+        yield b''
+
+    try:
+        with pytest.raises(MergeError):
+            # 비디오 입력이 깨져 FFmpeg가 먼저 끝나도 오디오 입력은 다음 청크를 기다리는 중
+            merge_to_file(iter([b'not a video' * 1000]), stuck(), str(tmp_path / 'out.mp4'))
+    finally:
+        release.set()
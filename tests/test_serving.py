@@ -0,0 +1,115 @@
+# tests/test_serving.py
+import email.utils
+import os
+
+import pytest
+from flask import Flask
+
+from api.serving import send_media_file
+
+DATA = bytes(range(256)) * 40  # 10240바이트
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(DATA)
+    app = Flask(__name__)
+    app.add_url_rule('/file', 'file', lambda: send_media_file(str(path)))
+    with app.test_client() as client:
+        yield client
+
+
+def _body(response):
+    data = response.get_data()
+    response.close()
+    return data
+
+
+def test_full_file(client):
+    response = client.get('/file')
+    assert response.status_code == 200
+    assert response.headers['Content-Length'] == str(len(DATA))
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['ETag']
+    assert _body(response) == DATA
+
+
+@pytest.mark.parametrize('header, start, end', [
+    ('bytes=10-19', 10, 19),
+    ('bytes=10000-', 10000, len(DATA) - 1),
+    ('bytes=10000-99999', 10000, len(DATA) - 1),
+    ('bytes=-16', len(DATA) - 16, len(DATA) - 1),
+])
+def test_single_range(client, header, start, end):
+    response = client.get('/file', headers={'Range': header})
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == f'bytes {start}-{end}/{len(DATA)}'
+    assert response.headers['Content-Length'] == str(end - start + 1)
+    assert _body(response) == DATA[start:end + 1]
+
+
+def test_multiple_ranges(client):
+    response = client.get('/file', headers={'Range': 'bytes=0-4,100-109,-3'})
+    assert response.status_code == 206
+    content_type = response.headers['Content-Type']
+    assert content_type.startswith('multipart/byteranges; boundary=')
+    boundary = content_type.split('boundary=')[1].encode()
+
+    body = _body(response)
+    assert response.headers['Content-Length'] == str(len(body))
+    parts = body.split(b'--' + boundary)
+    assert parts[0] == b'' and parts[-1] == b'--\r\n'
+    expected = [(0, 4), (100, 109), (len(DATA) - 3, len(DATA) - 1)]
+    for part, (start, end) in zip(parts[1:-1], expected):
+        head, payload = part.split(b'\r\n\r\n', 1)
+        assert f'Content-Range: bytes {start}-{end}/{len(DATA)}'.encode() in head
+        assert payload == DATA[start:end + 1] + b'\r\n'
+
+
+def test_unsatisfiable_range(client):
+    response = client.get('/file', headers={'Range': f'bytes={len(DATA)}-'})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(DATA)}'
+
+
+def test_malformed_range_sends_whole_file(client):
+    response = client.get('/file', headers={'Range': 'lines=1-2'})
+    assert response.status_code == 200
+    assert _body(response) == DATA
+
+
+def test_if_range(client):
+    first = client.get('/file')
+    etag, last_modified = first.headers['ETag'], first.headers['Last-Modified']
+    first.close()
+
+    for validator in (etag, last_modified):
+        response = client.get('/file', headers={'Range': 'bytes=0-9', 'If-Range': validator})
+        assert response.status_code == 206
+        assert _body(response) == DATA[:10]
+
+    stale_date = email.utils.formatdate(0, usegmt=True)
+    for validator in ('"stale"', f'W/{etag}', stale_date):
+        response = client.get('/file', headers={'Range': 'bytes=0-9', 'If-Range': validator})
+        assert response.status_code == 200
+        assert _body(response) == DATA
+
+
+def test_if_none_match(client, tmp_path):
+    first = client.get('/file')
+    etag = first.headers['ETag']
+    first.close()
+
+    response = client.get('/file', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert _body(response) == b''
+
+    # 파일이 바뀌면 ETag도 바뀜
+    path = tmp_path / 'video.mp4'
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    response = client.get('/file', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert _body(response) == DATA